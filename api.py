@@ -0,0 +1,221 @@
+"""Local HTTP/JSON export of the dashboard metrics for other tools.
+
+Usage: python api.py [--host 127.0.0.1] [--port 8601]
+
+The server can also run inside the Streamlit process (set
+AGENT_DASHBOARD_API_PORT), where it reads the dashboard's own data store.
+Every GET takes optional ``start``/``end`` dates (YYYY-MM-DD, inclusive;
+default the last 7 days with presence data):
+
+    /api/version                   data version and when it was loaded
+    /api/agents                    agents shown in the dashboard
+    /api/agents/<name>/metrics     one agent's totals, metrics and team standing
+    /api/team/metrics              every agent's totals and metrics, plus team medians
+
+Metrics are read from the snapshot's precomputed team table, so a request
+is a range sum rather than a recomputation. Responses carry
+``X-Data-Version`` and an ``ETag`` built from the data version and the
+request; a matching ``If-None-Match`` gets a 304 before any work is done,
+and serialized payloads are kept per data version for repeat requests.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from benchmarks import BENCHMARK_METRICS, metric_value, percentile_rank, team_median
+from data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8601
+DEFAULT_RANGE_DAYS = 7
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_value(value):
+    """Plain JSON scalar for a pandas/numpy number; NaN becomes null."""
+    if value is None:
+        return None
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def _etag_matches(if_none_match, etag):
+    """If-None-Match semantics: a list of tags or ``*``, compared weakly."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _parse_range(query, snapshot):
+    if snapshot.presence_days.empty:
+        raise ApiError(404, "report_presence.csv is empty or missing")
+    latest = snapshot.presence_days["Day"].max().date()
+    try:
+        end = date.fromisoformat(query["end"]) if "end" in query else latest
+        start = date.fromisoformat(query["start"]) if "start" in query else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise ApiError(400, "start and end must be dates in YYYY-MM-DD format")
+    if start > end:
+        raise ApiError(400, "start must not be after end")
+    return start, end
+
+
+def _agent_entry(totals):
+    return {
+        "totals": {field: _json_value(value) for field, value in totals.items()},
+        "metrics": {metric: _json_value(metric_value(totals, metric)) for metric in BENCHMARK_METRICS},
+    }
+
+
+def agent_payload(snapshot, agent, start, end):
+    totals = snapshot.team.range_totals(start, end)
+    if agent not in totals.index:
+        raise ApiError(404, f"unknown agent: {agent}")
+    entry = _agent_entry(totals.loc[agent])
+    distribution = snapshot.team.distribution(start, end)
+    team = {}
+    for metric, value in entry["metrics"].items():
+        values = distribution.get(metric)
+        if values is not None:
+            team[metric] = {
+                "median": _json_value(team_median(values)),
+                "percentile": None if value is None else round(percentile_rank(values, value), 1),
+                "agents": len(values),
+            }
+    return {"agent": agent, **entry, "team": team}
+
+
+def team_payload(snapshot, start, end):
+    totals = snapshot.team.range_totals(start, end)
+    distribution = snapshot.team.distribution(start, end)
+    return {
+        "agents": {agent: _agent_entry(row) for agent, row in totals.iterrows()},
+        "team_median": {metric: _json_value(team_median(values)) for metric, values in distribution.items()},
+    }
+
+
+class ExportAPI:
+    """Routes requests against the current snapshot of a ``DataStore``."""
+
+    def __init__(self, store, max_payloads=256):
+        self.store = store
+        self.max_payloads = max_payloads
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def handle(self, target, if_none_match=None):
+        """Return (status, headers, body bytes) for a GET of ``target``."""
+        snapshot = self.store.snapshot
+        if snapshot is None or snapshot.team is None:
+            return self._error(503, "data is still loading", {"Retry-After": "2"})
+
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        canonical = url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(query.items()))
+        etag = f'"{snapshot.version}-{hashlib.sha1(canonical.encode()).hexdigest()[:12]}"'
+        headers = {"ETag": etag, "X-Data-Version": snapshot.version, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return 304, headers, b""
+
+        key = (snapshot.version, canonical)
+        with self._lock:
+            body = self._payloads.get(key)
+            if body is not None:
+                self._payloads.move_to_end(key)
+        if body is None:
+            try:
+                body = json.dumps(
+                    {"data_version": snapshot.version, **self._route(snapshot, url.path, query)}
+                ).encode()
+            except ApiError as exc:
+                return self._error(exc.status, str(exc))
+            with self._lock:
+                self._payloads[key] = body
+                while len(self._payloads) > self.max_payloads:
+                    self._payloads.popitem(last=False)
+        return 200, {**headers, "Content-Type": "application/json"}, body
+
+    def _route(self, snapshot, path, query):
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+        if parts == ["api", "version"]:
+            return {"loaded_at": snapshot.loaded_at}
+        if parts == ["api", "agents"]:
+            return {"agents": snapshot.team.agents}
+        if len(parts) == 4 and parts[:2] == ["api", "agents"] and parts[3] == "metrics":
+            start, end = _parse_range(query, snapshot)
+            return {"start": str(start), "end": str(end), **agent_payload(snapshot, parts[2], start, end)}
+        if parts == ["api", "team", "metrics"]:
+            start, end = _parse_range(query, snapshot)
+            return {"start": str(start), "end": str(end), **team_payload(snapshot, start, end)}
+        raise ApiError(404, f"no such endpoint: {path}")
+
+    @staticmethod
+    def _error(status, message, headers=None):
+        return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps({"error": message}).encode()
+
+
+def make_server(api, host="127.0.0.1", port=DEFAULT_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without this, delayed ACKs
+        # add ~40ms to every keep-alive response.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            status, headers, body = api.handle(self.path, self.headers.get("If-None-Match"))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_background(store, host="127.0.0.1", port=DEFAULT_PORT):
+    """Start the export server on a daemon thread and return it."""
+    server = make_server(ExportAPI(store), host, port)
+    threading.Thread(target=server.serve_forever, name="export-api", daemon=True).start()
+    logger.info("Export API listening on http://%s:%s", host, port)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = DataStore()
+    store.start()
+    store.ready.wait()
+    server = make_server(ExportAPI(store), args.host, args.port)
+    logger.info("Export API listening on http://%s:%s", args.host, args.port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,47 @@
+import logging
+import math
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-from pandas.errors import EmptyDataError
-from datetime import datetime, timedelta, time as dtime, date as date_type
+from datetime import date, datetime, timedelta
+
+from api import serve_in_background
+from benchmarks import metric_value, percentile_rank, team_median
+from cache import DailyResultCache
+from cases import case_key
+from data_store import DataStore, active_agents
+from forecasting import fit_arrival_profile, history_window, staffing_plan
+from metrics import PRESENCE_DURATION_COLUMNS
+from templates import Card, Incident, cards_html, empty_state_html, incident_list_html
+from trends import ROLLING_WINDOWS
+from validation import build_quality_report
+from views import LONG_CHAT_COLUMNS, build_agent_history_view, build_agent_range_view
+
+logger = logging.getLogger(__name__)
+
+run_started = time.perf_counter()
+run_timings = {}
 
 # IMPORTANT: st.set_page_config must be called as the very first Streamlit command
 st.set_page_config(page_title="Agent Dashboard", layout="wide")
 
-# --- Load the SVG Logo (wrapped in try so it doesn't crash if missing) ---
-try:
-    with open("goat_logo.svg", "r", encoding="utf-8") as f:
-        svg_code = f.read()
-except Exception:
-    svg_code = ""
+
+@st.cache_resource
+def load_logo_svg():
+    """Read the SVG logo once per process (empty if missing so it never crashes)."""
+    try:
+        with open("goat_logo.svg", "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception:
+        return ""
+
+
+def mark_timing(stage):
+    run_timings[stage] = round((time.perf_counter() - run_started) * 1000, 1)
+    st.session_state["run_timings"] = dict(run_timings)
+
 
 # Design system tokens + component styles
 st.markdown("""
@@ -152,6 +182,18 @@ st.markdown("""
         line-height: 1.1;
     }
 
+    .card-row {
+        display: grid;
+        column-gap: 1rem;
+    }
+
+    .metric-benchmark {
+        font-size: 0.75rem;
+        font-weight: 500;
+        color: var(--color-text-label);
+        margin-top: 8px;
+    }
+
     /* ── WARNING CARDS ───────────────────────────────────── */
     .metric-container-warning {
         padding: var(--card-padding);
@@ -248,174 +290,104 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-
 # -----------------------------
-# Data loading helpers
+# Header skeleton (painted before any data is loaded)
 # -----------------------------
-def safe_read_csv(path, **kwargs):
-    """Read a CSV and gracefully handle empty files."""
-    try:
-        return pd.read_csv(path, **kwargs)
-    except EmptyDataError:
-        return pd.DataFrame()
-
-
-def load_data():
-    # Items
-    df_items = safe_read_csv("report_items.csv", dayfirst=True)
-    if not df_items.empty:
-        df_items["Start DT"] = pd.to_datetime(df_items["Start DT"], dayfirst=True, errors="coerce")
-        df_items["End DT"] = pd.to_datetime(df_items["End DT"], dayfirst=True, errors="coerce")
-        df_items["User: Full Name"] = df_items["User: Full Name"].astype(str).str.strip()
-        df_items["Service Channel: Developer Name"] = df_items["Service Channel: Developer Name"].astype(str).str.strip()
-
-    # Presence
-    df_presence = safe_read_csv("report_presence.csv", dayfirst=True)
-    if not df_presence.empty:
-        df_presence["Start DT"] = pd.to_datetime(df_presence["Start DT"], dayfirst=True, errors="coerce")
-        df_presence["End DT"] = pd.to_datetime(df_presence["End DT"], dayfirst=True, errors="coerce")
-        df_presence["Created By: Full Name"] = df_presence["Created By: Full Name"].astype(str).str.strip()
-        df_presence["Service Presence Status: Developer Name"] = df_presence["Service Presence Status: Developer Name"].astype(str).str.strip()
-
-    # Shifts
-    df_shifts = safe_read_csv("shifts.csv")
-    if not df_shifts.empty:
-        if "Column1" in df_shifts.columns and "Agent Name" not in df_shifts.columns:
-            df_shifts.rename(columns={"Column1": "Agent Name"}, inplace=True)
-        if "Agent Name" in df_shifts.columns:
-            df_shifts["Agent Name"] = df_shifts["Agent Name"].astype(str).str.strip()
-
-    # Chat transcripts — one row per conversation, with exact start/end times
-    df_chat = safe_read_csv("chat_transcripts.csv")
-    if df_chat.empty:
-        # Try common alternative filenames in case it was uploaded differently
-        for alt in ["chat_transcript.csv", "chat.csv", "transcripts.csv", "report1771339850121.csv"]:
-            df_chat = safe_read_csv(alt)
-            if not df_chat.empty:
-                break
-    if not df_chat.empty:
-        # Brute-force clean every column name: remove BOM, strip whitespace,
-        # then build a lookup that matches regardless of BOM or encoding quirks
-        clean = {col: col.encode("utf-8").decode("utf-8-sig").strip() for col in df_chat.columns}
-        df_chat.rename(columns=clean, inplace=True)
-
-        # Now find the agent column — it may be "Owner: Full Name" or a BOM variant
-        agent_col = next((c for c in df_chat.columns if "Full Name" in c), None)
-        if agent_col and agent_col != "Agent Name":
-            df_chat.rename(columns={agent_col: "Agent Name"}, inplace=True)
-
-        # Normalise Case Number column
-        case_col = next((c for c in df_chat.columns if "Case Number" in c), None)
-        if case_col and case_col != "Case Number":
-            df_chat.rename(columns={case_col: "Case Number"}, inplace=True)
-
-        if "Agent Name" in df_chat.columns:
-            df_chat["Agent Name"] = df_chat["Agent Name"].astype(str).str.strip()
-        if "Start Time" in df_chat.columns:
-            df_chat["Start DT"] = pd.to_datetime(df_chat["Start Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
-        if "End Time" in df_chat.columns:
-            df_chat["End DT"] = pd.to_datetime(df_chat["End Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
-        if "Start DT" in df_chat.columns and "End DT" in df_chat.columns:
-            df_chat["Duration (s)"] = (df_chat["End DT"] - df_chat["Start DT"]).dt.total_seconds()
-            # Drop abandoned chats (zero/null duration — visitor left before agent responded)
-            df_chat = df_chat[
-                df_chat["Start DT"].notna() &
-                df_chat["End DT"].notna() &
-                (df_chat["Duration (s)"] > 0)
-            ].copy()
-
-    return df_items, df_presence, df_shifts, df_chat
-
-
-df_items, df_presence, df_shifts, df_chat = load_data()
-
-if df_presence.empty or df_items.empty or df_shifts.empty:
-    st.error("One or more data files are empty or missing. Please check report_items.csv, report_presence.csv, and shifts.csv.")
-    st.stop()
+header_slot = st.empty()
 
 
-# -----------------------------
-# Utility functions
-# -----------------------------
-def normalise_shift_value(value):
-    """Return a clean shift/event string from the rota cell."""
-    if pd.isna(value):
-        return ""
-    return " ".join(str(value).replace("\n", " ").strip().split())
+def render_header(title):
+    header_slot.markdown(f"""
+        <div class="custom-main-header-container">
+            <h1>{title}</h1>
+            <div class="header-logo-inline">{load_logo_svg()}</div>
+        </div>
+    """, unsafe_allow_html=True)
 
 
-def get_shift_value(agent_shift_row, shift_col):
-    if agent_shift_row.empty or shift_col not in df_shifts.columns:
-        return ""
-    return normalise_shift_value(agent_shift_row[shift_col].values[0])
+render_header("Agent Dashboard")
+mark_timing("first_paint")
+
 
+@st.cache_resource
+def get_data_store():
+    """Shared data snapshot, loaded and hot-reloaded in a background thread."""
+    store = DataStore()
+    store.start()
+    return store
 
-def is_not_assigned_shift(shift_str):
-    text = normalise_shift_value(shift_str).lower()
-    return text in {"", "nan", "not assigned", "n/a", "na", "day off", "off"}
 
+@st.cache_resource
+def get_daily_cache():
+    """Per-day adherence rows shared across reruns and sessions."""
+    return DailyResultCache(max_bytes=32 * 1024 * 1024)
 
-def is_sick_shift(shift_str):
-    text = normalise_shift_value(shift_str).lower()
-    return any(word in text for word in ["sick", "sickness", "illness", "ill"])
 
+@st.cache_resource
+def get_export_api():
+    """JSON export served from this process when AGENT_DASHBOARD_API_PORT is set.
+
+    It reads the same data store as the dashboard, so both serve one version.
+    If the port cannot be bound (e.g. ``python api.py`` already holds it) the
+    error is returned instead, so it is cached and reruns do not retry it.
+    """
+    port = os.environ.get("AGENT_DASHBOARD_API_PORT")
+    if not port:
+        return None
+    try:
+        return serve_in_background(get_data_store(), port=int(port))
+    except OSError as exc:
+        logger.warning("Export API not started on port %s: %s", port, exc)
+        return exc
 
-def is_manual_late_shift(shift_str):
-    text = normalise_shift_value(shift_str).lower()
-    return "late" in text
 
+# Derived tables are keyed on the data version; the frames themselves are not hashed.
+@st.cache_data(show_spinner=False, max_entries=4)
+def get_quality_report(data_version, _df_items, _df_presence, _df_chat):
+    return build_quality_report(_df_items, _df_presence, _df_chat)
 
-def parse_shift_range(shift_str, base_date):
-    """Parse rota shifts like '7:00 AM - 4:00 PM', even if notes/newlines are present."""
-    import re
 
-    text = normalise_shift_value(shift_str)
-    if not text:
-        return None, None
+# Agent payloads are shared by every session. cache_resource computes each key
+# once under a per-key lock, so sessions opening the same link at the same
+# time wait for that one result; all of them then read the same object.
+@st.cache_resource(show_spinner=False, max_entries=256)
+def get_agent_range_view(data_version, agent, start, end, _snapshot):
+    return build_agent_range_view(_snapshot, get_daily_cache(), agent, start, end)
 
-    # Accept both hyphen and en dash separators, and ignore notes such as Sick/Late after the times.
-    matches = re.findall(r"\b(\d{1,2}:\d{2}\s*(?:AM|PM)?)\b", text, flags=re.IGNORECASE)
-    if len(matches) < 2:
-        return None, None
 
-    parsed_times = []
-    for part in matches[:2]:
-        part = part.strip().upper().replace(" ", "")
-        for fmt in ("%I:%M%p", "%H:%M"):
-            try:
-                parsed_times.append(datetime.strptime(part, fmt).time())
-                break
-            except ValueError:
-                continue
+@st.cache_resource(show_spinner=False, max_entries=256)
+def get_agent_history_view(data_version, agent, anchor, lookbacks, trend_window, _snapshot):
+    return build_agent_history_view(_snapshot, agent, anchor, *lookbacks, trend_window)
 
-    if len(parsed_times) < 2:
-        return None, None
 
-    start_dt = datetime.combine(base_date, parsed_times[0])
-    end_dt = datetime.combine(base_date, parsed_times[1])
-    if end_dt <= start_dt:
-        end_dt += timedelta(days=1)
-    return start_dt, end_dt
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_staffing_plan(data_version, _df_chat, _rota, start, end, service_level, answer_seconds, concurrency):
+    """Interval staffing plan for ``start``..``end`` and the history dates it was fitted on."""
+    history = history_window(_df_chat, start)
+    profile = fit_arrival_profile(_df_chat, *history)
+    return staffing_plan(profile, _rota, start, end, service_level, answer_seconds, concurrency), history
 
 
-def has_shift_time(shift_str, base_date):
-    sched_start, sched_end = parse_shift_range(shift_str, base_date)
-    return sched_start is not None and sched_end is not None
+# Presence is loaded first so the agent list and date bounds are available
+# while items and chat transcripts are still being parsed.
+data_store = get_data_store()
+export_api = get_export_api()
+if not data_store.presence_ready.is_set():
+    with st.spinner("Loading presence…"):
+        data_store.presence_ready.wait()
+snapshot = data_store.snapshot
 
+if snapshot is None or snapshot.df_presence.empty:
+    st.error("report_presence.csv is empty or missing. The dashboard needs presence data to list agents.")
+    st.stop()
 
-def classify_rota_day(shift_str, base_date):
-    shift_str = normalise_shift_value(shift_str)
-    if is_not_assigned_shift(shift_str):
-        return "not_assigned"
-    if is_sick_shift(shift_str):
-        return "sick"
-    if has_shift_time(shift_str, base_date):
-        return "scheduled"
-    if is_manual_late_shift(shift_str):
-        return "manual_late"
-    return "other_event"
+df_presence = snapshot.df_presence
+mark_timing("presence_loaded")
 
 
+# -----------------------------
+# Utility functions
+# -----------------------------
 def format_seconds_to_mm_ss(total_seconds):
     if total_seconds is None:
         return "–"
@@ -424,23 +396,74 @@ def format_seconds_to_mm_ss(total_seconds):
     return f"{minutes:02d}:{seconds:02d}"
 
 
-# -----------------------------
-# Sidebar controls
-# -----------------------------
-agents = sorted(df_presence["Created By: Full Name"].dropna().unique())
+def format_seconds_to_hh_mm(total_seconds):
+    return f"{int(total_seconds // 3600):02d}:{int(total_seconds % 3600 // 60):02d}"
+
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
 
-# --- REMOVE AGENTS WHO HAVE LEFT THE COMPANY ---
-agents_to_remove = [
-    "Atuweni Masangano",
-    "Dorah Mwase",
-    "Jonathan Mandala",
-    "Lindah Sewero",
-    "Shiellah Phuka",
-]
+def benchmark_text(distribution, metric, value, fmt):
+    """Team median and the agent's percentile rank, or "" when there is nothing to compare."""
+    team = distribution.get(metric)
+    if value is None or team is None:
+        return ""
+    rank = int(round(percentile_rank(team, value)))
+    return f"Team median {fmt(team_median(team))} · {ordinal(rank)} percentile"
+
+
+def benchmark_html(distribution, metric, value, fmt):
+    text = benchmark_text(distribution, metric, value, fmt)
+    return f'<div class="metric-benchmark">{text}</div>' if text else ""
+
+
+def trend_chart(frame, y_title):
+    """Line chart of a wide frame indexed by day.
+
+    Passes a Vega-Lite spec directly; st.line_chart builds an Altair chart on
+    every rerun, which costs far more than drawing a few hundred points.
+    """
+    data = frame.rename_axis("Day").reset_index().melt("Day", var_name="Series", value_name="Value").dropna()
+    st.vega_lite_chart(
+        data,
+        {
+            "mark": {"type": "line", "point": False},
+            "encoding": {
+                "x": {"field": "Day", "type": "temporal", "title": None},
+                "y": {"field": "Value", "type": "quantitative", "title": y_title},
+                "color": {"field": "Series", "type": "nominal", "title": None},
+                "tooltip": [
+                    {"field": "Day", "type": "temporal"},
+                    {"field": "Series", "type": "nominal"},
+                    {"field": "Value", "type": "quantitative", "format": ".1f"},
+                ],
+            },
+            "height": 280,
+        },
+        width="stretch",
+    )
 
-agents = [a for a in agents if a not in agents_to_remove]
 
-agent = st.sidebar.selectbox("Agent Name", agents)
+# -----------------------------
+# Sidebar controls
+# -----------------------------
+agents = active_agents(df_presence)
+
+# The agent and date range are mirrored in the URL (?agent=…&start=…&end=…)
+# so a view can be shared as a link. The URL seeds the widgets when a session
+# starts; after that the widgets drive the URL.
+if st.session_state.get("agent") not in agents:
+    requested_agent = st.query_params.get("agent")
+    st.session_state["agent"] = requested_agent if requested_agent in agents else agents[0]
+agent = st.sidebar.selectbox("Agent Name", agents, key="agent")
+
+LOOKBACK_OPTIONS = [30, 90, 180, 365]
+lateness_lookback = st.sidebar.selectbox("Lateness lookback (days)", LOOKBACK_OPTIONS, index=0)
+absence_lookback = st.sidebar.selectbox("Absence lookback (days)", LOOKBACK_OPTIONS, index=1)
+trend_lookback = st.sidebar.selectbox("Trend lookback (days)", LOOKBACK_OPTIONS, index=2)
+trend_window = st.sidebar.selectbox("Rolling window (days)", ROLLING_WINDOWS, index=0)
 
 # Build list of all dates we have presence data for
 raw_dates = sorted(df_presence["Start DT"].dt.date.unique())
@@ -449,13 +472,25 @@ available_dates = [pd.to_datetime(d).date() for d in raw_dates]
 min_date = min(available_dates)
 max_date = max(available_dates)
 
+
+def query_date(name, default):
+    """A date query parameter clamped to the data, or ``default`` if absent or malformed."""
+    try:
+        value = date.fromisoformat(st.query_params.get(name, ""))
+    except ValueError:
+        return default
+    return min(max(value, min_date), max_date)
+
+
+stored_range = st.session_state.get("date_range")
+if not stored_range or not all(min_date <= d <= max_date for d in stored_range):
+    # The week ending on the requested end date; default: the last 7 days.
+    query_end = query_date("end", max_date)
+    query_start = min(query_date("start", max(query_end - timedelta(days=6), min_date)), query_end)
+    st.session_state["date_range"] = (query_start, query_end)
+
 # Date range selector (Option A – unified range)
-date_range = st.sidebar.date_input(
-    "Date range",
-    value=(max_date - timedelta(days=6), max_date),  # default: last 7 days
-    min_value=min_date,
-    max_value=max_date,
-)
+date_range = st.sidebar.date_input("Date range", min_value=min_date, max_value=max_date, key="date_range")
 
 # Robust handling whether user selects a single date or a range
 if isinstance(date_range, (list, tuple)):
@@ -471,15 +506,14 @@ else:
 if start_date > end_date:
     start_date, end_date = end_date, start_date
 
+view_params = {"agent": agent, "start": start_date.isoformat(), "end": end_date.isoformat()}
+if {name: st.query_params.get(name) for name in view_params} != view_params:
+    st.query_params.update(view_params)
+
 # -----------------------------
 # Header (Agent + Date range)
 # -----------------------------
-st.markdown(f"""
-    <div class="custom-main-header-container">
-        <h1>Agent Dashboard for {agent}</h1>
-        <div class="header-logo-inline">{svg_code}</div>
-    </div>
-""", unsafe_allow_html=True)
+render_header(f"Agent Dashboard for {agent}")
 
 if start_date == end_date:
     date_label = start_date.strftime("%d %B %Y")
@@ -492,152 +526,160 @@ st.markdown(
 )
 st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
 
+if not snapshot.complete:
+    with st.spinner("Loading items and chat transcripts…"):
+        data_store.ready.wait()
+    snapshot = data_store.snapshot
+
+if not snapshot.complete:
+    st.error(
+        f"Items, chat transcripts or case exports could not be loaded: {data_store.last_error}. "
+        "The export is retried automatically; reload the page once it has been fixed."
+    )
+    st.stop()
+
+data_version = snapshot.version
+df_items, df_presence, df_shifts, df_chat = (
+    snapshot.df_items, snapshot.df_presence, snapshot.df_shifts, snapshot.df_chat
+)
+mark_timing("data_loaded")
+
+loaded_at = datetime.fromtimestamp(snapshot.loaded_at).strftime("%d %b %H:%M")
+st.sidebar.caption(f"Data version {data_version} · loaded {loaded_at}")
+if data_store.last_error:
+    st.sidebar.caption(f"⚠️ Latest export could not be loaded: {data_store.last_error}")
+if isinstance(export_api, OSError):
+    st.sidebar.caption(f"⚠️ Export API not started: {export_api}")
+
+quality_report = get_quality_report(data_version, df_items, df_presence, df_chat)
+quality_issues = sum(len(rows) for rows in quality_report.values())
+quality_label = f"⚠️ Data quality: {quality_issues} issues" if quality_issues else "✅ Data quality: no issues"
+with st.sidebar.expander(quality_label):
+    if not quality_report:
+        st.caption("All checks passed for this data version.")
+    for label, rows in quality_report.items():
+        st.markdown(f"**{label}** — {len(rows)}")
+        st.dataframe(rows.head(50), width="stretch", hide_index=True)
+
 # -----------------------------
-# Filter data to agent + range
+# Agent payloads (shared across sessions)
 # -----------------------------
-range_start_dt = datetime.combine(start_date, dtime(0, 0))
-range_end_dt = datetime.combine(end_date, dtime(23, 59))
-
-df_presence_agent_range = df_presence[
-    (df_presence["Created By: Full Name"] == agent)
-    & (df_presence["End DT"] >= range_start_dt)
-    & (df_presence["Start DT"] <= range_end_dt)
-].copy()
-
-# Items: filter by agent first, then by Start DT's DATE between start_date and end_date.
-df_items_agent = df_items[
-    (df_items["User: Full Name"] == agent)
-    & (~df_items["Start DT"].isna())
-    & (~df_items["End DT"].isna())
-].copy()
-df_items_agent["Start Date"] = df_items_agent["Start DT"].dt.date
-
-df_items_agent_range = df_items_agent[
-    (df_items_agent["Start Date"] >= start_date)
-    & (df_items_agent["Start Date"] <= end_date)
-].copy()
-
-# List of days in the selected range
-day_list = [
-    start_date + timedelta(days=i)
-    for i in range((end_date - start_date).days + 1)
-]
-
-# Check schedule in range
-agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
-has_scheduled_shift = False
-has_sick_event = False
-for d in day_list:
-    shift_col = d.strftime("%d/%m/%Y")
-    sched_shift = get_shift_value(agent_shift_row, shift_col)
-    day_type = classify_rota_day(sched_shift, d)
-    if day_type == "scheduled":
-        has_scheduled_shift = True
-    elif day_type == "sick":
-        has_sick_event = True
-
-    if has_scheduled_shift and has_sick_event:
-        break
+rota_model = snapshot.rota_model
+with st.spinner("Loading agent view…"):
+    view = get_agent_range_view(data_version, agent, start_date, end_date, snapshot)
 
 # -----------------------------
 # High-level conditional view
 # -----------------------------
-if has_sick_event and not has_scheduled_shift and df_presence_agent_range.empty:
-    st.markdown("""
-        <div class="empty-state">
-            <img src="app/static/absent.png" width="220" style="opacity:0.85;" />
-            <div class="empty-state-label">Sickness recorded in this date range</div>
-        </div>
-    """, unsafe_allow_html=True)
-elif not has_scheduled_shift and df_presence_agent_range.empty:
-    st.markdown("""
-        <div class="empty-state">
-            <img src="app/static/day_off.png" width="220" style="opacity:0.85;" />
-            <div class="empty-state-label">No shifts scheduled in this date range</div>
-        </div>
-    """, unsafe_allow_html=True)
-elif has_scheduled_shift and df_presence_agent_range.empty:
-    st.markdown("""
-        <div class="empty-state">
-            <img src="app/static/absent.png" width="220" style="opacity:0.85;" />
-            <div class="empty-state-label">Absent for all scheduled shifts in this date range</div>
-        </div>
-    """, unsafe_allow_html=True)
+if view.has_sick_event and not view.has_scheduled_shift and not view.has_presence:
+    st.markdown(
+        empty_state_html("Sickness recorded in this date range", "app/static/absent.png"), unsafe_allow_html=True
+    )
+elif not view.has_scheduled_shift and not view.has_presence:
+    st.markdown(
+        empty_state_html("No shifts scheduled in this date range", "app/static/day_off.png"), unsafe_allow_html=True
+    )
+elif view.has_scheduled_shift and not view.has_presence:
+    st.markdown(
+        empty_state_html("Absent for all scheduled shifts in this date range", "app/static/absent.png"),
+        unsafe_allow_html=True,
+    )
 else:
     # =========================================================
     # AHT & Volume – Selected Range
     # =========================================================
     st.markdown("### Average Handling Time & Volume")
 
-    df_range_items = df_items_agent_range.copy()
-    df_range_items["Duration"] = (df_range_items["End DT"] - df_range_items["Start DT"]).dt.total_seconds()
-
-    chat_items = df_range_items[df_range_items["Service Channel: Developer Name"] == "sfdc_liveagent"]
-    email_items = df_range_items[df_range_items["Service Channel: Developer Name"] == "casesChannel"]
-
-    aht_chat = chat_items["Duration"].mean() if not chat_items.empty else None    # seconds
-    aht_email = email_items["Duration"].mean() if not email_items.empty else None
+    range_totals = view.range_totals
+
+    num_chat_items = int(range_totals["chat_items"])
+    num_email_items = int(range_totals["email_items"])
+
+    aht_chat = range_totals["chat_seconds"] / num_chat_items if num_chat_items else None    # seconds
+    aht_email = range_totals["email_seconds"] / num_email_items if num_email_items else None
+
+    def share(numerator, denominator):
+        return range_totals[numerator] / range_totals[denominator] if range_totals[denominator] > 0 else 0.0
+
+    shift_utilization = share("handling_seconds", "available_seconds_exact")
+    chat_utilization = share("chat_handling_seconds", "chat_available_seconds")
+    email_utilization = share("email_handling_seconds", "email_available_seconds")
+    occupancy = share("weighted_load_seconds", "available_seconds_exact")
+
+    # The agent's standing within the team over the same range.
+    range_benchmarks = view.range_benchmarks
+    card_benchmarks = {
+        metric: benchmark_html(range_benchmarks, metric, metric_value(range_totals, metric), fmt)
+        for metric, fmt in (
+            ("aht_chat", format_seconds_to_mm_ss),
+            ("aht_email", format_seconds_to_mm_ss),
+            ("shift_utilisation", "{:.1%}".format),
+            ("chat_utilisation", "{:.1%}".format),
+            ("email_utilisation", "{:.1%}".format),
+            ("occupancy", "{:.1%}".format),
+        )
+    }
 
-    num_chat_items = len(chat_items)
-    num_email_items = len(email_items)
+    if df_items.empty:
+        st.info("report_items.csv not found. AHT, volume and utilisation are unavailable until it is exported.")
+    else:
+        st.markdown(
+            cards_html(
+                [
+                    Card(
+                        "AHT Chat (mm:ss)", format_seconds_to_mm_ss(aht_chat), "accent",
+                        card_benchmarks["aht_chat"], [("Chat Items", num_chat_items)],
+                    ),
+                    Card(
+                        "AHT Email (mm:ss)", format_seconds_to_mm_ss(aht_email), "accent",
+                        card_benchmarks["aht_email"], [("Email Items", num_email_items)],
+                    ),
+                ],
+                [Card("Shift Utilisation", f"{shift_utilization:.1%}", "accent", card_benchmarks["shift_utilisation"])],
+                [
+                    Card("Chat Utilisation", f"{chat_utilization:.1%}", "plain", card_benchmarks["chat_utilisation"]),
+                    Card("Email Utilisation", f"{email_utilization:.1%}", "plain", card_benchmarks["email_utilisation"]),
+                    Card("Occupancy (Concurrent)", f"{occupancy:.1%}", "plain", card_benchmarks["occupancy"]),
+                ],
+            ),
+            unsafe_allow_html=True,
+        )
 
     # =========================================================
-    # Shift Utilisation – Selected Range
+    # Idle, capacity & away time – Omni-Channel's own durations
     # =========================================================
-    minutes = pd.date_range(start=range_start_dt, end=range_end_dt, freq="min", inclusive="left")
-
-    total_available_minutes = 0
-    total_handling_minutes = 0
+    st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+    st.markdown("### Idle, Capacity & Away Time")
 
-    with st.spinner("Calculating utilisation…"):
-        for t in minutes:
-            pres_at_t = df_presence_agent_range[
-                (df_presence_agent_range["Start DT"] <= t)
-                & (df_presence_agent_range["End DT"] > t)
-            ]
-            status = pres_at_t.iloc[0]["Service Presence Status: Developer Name"] if not pres_at_t.empty else None
-
-            if status in ("Available_Chat", "Available_Email_and_Web", "Available_All"):
-                total_available_minutes += 1
-
-                is_handling = not df_items_agent_range[
-                    (df_items_agent_range["Service Channel: Developer Name"].isin(["sfdc_liveagent", "casesChannel"]))
-                    & (df_items_agent_range["Start DT"] <= t)
-                    & (df_items_agent_range["End DT"] > t)
-                ].empty
-
-                if is_handling:
-                    total_handling_minutes += 1
-
-    shift_utilization = total_handling_minutes / total_available_minutes if total_available_minutes > 0 else 0.0
-
-    col_aht1, col_aht2 = st.columns(2)
-    with col_aht1:
-        st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">AHT Chat (mm:ss)</div>
-                <div class="metric-value-accent">{format_seconds_to_mm_ss(aht_chat) if aht_chat is not None else "–"}</div>
-                <div class="metric-title" style="margin-top:12px;">Chat Items</div>
-                <div class="metric-value">{num_chat_items}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col_aht2:
-        st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">AHT Email (mm:ss)</div>
-                <div class="metric-value-accent">{format_seconds_to_mm_ss(aht_email) if aht_email is not None else "–"}</div>
-                <div class="metric-title" style="margin-top:12px;">Email Items</div>
-                <div class="metric-value">{num_email_items}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-title">Shift Utilisation</div>
-            <div class="metric-value-accent">{shift_utilization:.1%}</div>
-        </div>
-    """, unsafe_allow_html=True)
+    if not set(PRESENCE_DURATION_COLUMNS).issubset(df_presence.columns):
+        st.info("report_presence.csv has no Is Away / Idle / At Capacity / Status Duration columns.")
+    else:
+        online_seconds = range_totals["online_seconds"]
+        presence_benchmarks = {
+            metric: benchmark_html(range_benchmarks, metric, metric_value(range_totals, metric), fmt)
+            for metric, fmt in (
+                ("idle_share", "{:.1%}".format),
+                ("at_capacity_share", "{:.1%}".format),
+                ("away_time", format_seconds_to_hh_mm),
+            )
+        }
+        st.markdown(
+            cards_html([
+                Card(
+                    "Idle Share", f"{share('idle_seconds', 'online_seconds'):.1%}", "accent",
+                    presence_benchmarks["idle_share"], [("Online Time", format_seconds_to_hh_mm(online_seconds))],
+                ),
+                Card(
+                    "At-Capacity Share", f"{share('at_capacity_seconds', 'online_seconds'):.1%}", "plain",
+                    presence_benchmarks["at_capacity_share"],
+                ),
+                Card(
+                    "Away Time", format_seconds_to_hh_mm(range_totals["away_seconds"]), "plain",
+                    presence_benchmarks["away_time"],
+                ),
+            ]),
+            unsafe_allow_html=True,
+        )
 
     # =========================================================
     # Long Chat Handles (>= 15 minutes)
@@ -649,33 +691,28 @@ else:
     st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
     st.markdown("### Long Chat Handles (≥ 15 min)")
 
-    LONG_CHAT_THRESHOLD_SECONDS = 15 * 60
-
-    required_chat_cols = {"Agent Name", "Start DT", "End DT", "Duration (s)"}
-    if df_chat.empty or not required_chat_cols.issubset(df_chat.columns):
+    long_chats = view.long_chats
+    if long_chats is None:
         if df_chat.empty:
             st.warning("⚠️ chat_transcripts.csv not found. Make sure it is committed to your repository.")
         else:
             found_cols = list(df_chat.columns)
-            missing = required_chat_cols - set(df_chat.columns)
+            missing = LONG_CHAT_COLUMNS - set(df_chat.columns)
             st.warning(f"⚠️ chat_transcripts.csv loaded but missing expected columns.\n\nFound: `{found_cols}`\n\nMissing: `{missing}`")
     else:
-        # Filter to this agent, within the selected date range
-        agent_chats = df_chat[
-            (df_chat["Agent Name"] == agent) &
-            (df_chat["Start DT"].dt.date >= start_date) &
-            (df_chat["Start DT"].dt.date <= end_date)
-        ].copy()
-
-        long_chats = agent_chats[
-            agent_chats["Duration (s)"] >= LONG_CHAT_THRESHOLD_SECONDS
-        ].sort_values("Start DT").reset_index(drop=True)
+        long_chat_totals = {"long_chats": len(long_chats), "days_worked": range_totals["days_worked"]}
+        long_chat_benchmark = benchmark_text(
+            range_benchmarks, "long_chats", metric_value(long_chat_totals, "long_chats"), "{:g}".format
+        )
+        if long_chat_benchmark:
+            st.caption(f"{len(long_chats)} long chats in range · {long_chat_benchmark}")
 
         if long_chats.empty:
             st.info("No chat conversations of 15 minutes or more in the selected range.")
         else:
-            long_chats["Handle Time (mm:ss)"] = long_chats["Duration (s)"].apply(
-                format_seconds_to_mm_ss
+            # The payload is shared between sessions, so format a copy.
+            long_chats = long_chats.assign(
+                **{"Handle Time (mm:ss)": long_chats["Duration (s)"].apply(format_seconds_to_mm_ss)}
             )
 
             display_cols = [
@@ -694,50 +731,61 @@ else:
                 hide_index=True,
             )
 
-    st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
-    st.markdown("### Daily Overview")
-
-    total_shift_seconds = 0
-    total_available_seconds = 0
-    days_worked = 0
-
-    lunch_days_with_data = 0
-    lunch_days_out_of_window = 0
-
-    available_statuses = {"Available_Chat", "Available_Email_and_Web", "Available_All"}
+            # Drill-down: every lookup below is a hash-map hit in the ingest-time case index.
+            long_chat_cases = (
+                [key for key in map(case_key, long_chats["Case Number"]) if key]
+                if "Case Number" in long_chats.columns else []
+            )
+            if long_chat_cases:
+                selected_case = st.selectbox("Related records for case", long_chat_cases, key="related_case")
+                related = snapshot.cases.related(selected_case)
+                st.caption(" · ".join(f"{label}: {len(rows)}" for label, rows in related.items()))
+                for label, rows in related.items():
+                    if label != "Chats" and not rows.empty:
+                        st.markdown(f"**{label}**")
+                        st.dataframe(rows, width="stretch", hide_index=True)
 
-    for d in day_list:
-        agent_daily = df_presence_agent_range[df_presence_agent_range["Start DT"].dt.date == d].copy()
-        if agent_daily.empty:
-            continue
+    st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+    st.markdown("### Customer Outcomes")
 
-        days_worked += 1
+    agent_surveys, agent_emails = view.surveys, view.emails
 
-        first_segment_start = agent_daily["Start DT"].min()
-        last_segment_end = agent_daily["End DT"].max()
-        day_shift_duration = (last_segment_end - first_segment_start).total_seconds()
-        total_shift_seconds += day_shift_duration
+    if agent_surveys.empty and agent_emails.empty:
+        coverage = snapshot.cases.coverage()
+        if coverage["surveys_linked"] or coverage["emails_linked"]:
+            st.info("No survey responses or email cases linked to this agent in the selected range.")
+        else:
+            reasons = [
+                f"{name} was not found or is empty" if not coverage[key] else f"{name} carries no case number or owner"
+                for name, key in (("survey.csv", "surveys"), ("email.csv", "emails"))
+            ]
+            st.info("Survey responses and email cases cannot be linked to agents yet: " + "; ".join(reasons) + ".")
+    else:
+        no_values = pd.Series(dtype=float)
+        scores = agent_surveys.get("Score", no_values).dropna()
+        resolved = agent_surveys.get("Resolved", no_values).dropna()
+        met_sla = agent_emails.get("Met SLA", no_values).dropna().astype(float)
+        st.markdown(
+            cards_html([
+                Card("Satisfaction (1-5)", f"{scores.mean():.2f}" if len(scores) else "–", "accent", "",
+                     [("Responses", len(scores))]),
+                Card("Resolved (survey)", f"{resolved.mean():.0%}" if len(resolved) else "–", "plain", "",
+                     [("Responses", len(resolved))]),
+                Card("Email SLA Met", f"{met_sla.mean():.0%}" if len(met_sla) else "–", "plain", "",
+                     [("Email Cases", len(met_sla))]),
+            ]),
+            unsafe_allow_html=True,
+        )
 
-        # Use the scheduled rota start time as the reference point for lunch compliance.
-        shift_col = d.strftime("%d/%m/%Y")
-        scheduled_shift = get_shift_value(agent_shift_row, shift_col)
-        scheduled_shift_start, _ = parse_shift_range(scheduled_shift, d)
+    st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+    st.markdown("### Daily Overview")
 
-        avail_df_day = agent_daily[agent_daily["Service Presence Status: Developer Name"].isin(available_statuses)]
-        if not avail_df_day.empty:
-            day_available_seconds = (avail_df_day["End DT"] - avail_df_day["Start DT"]).dt.total_seconds().sum()
-            total_available_seconds += day_available_seconds
+    total_shift_seconds = range_totals["shift_seconds"]
+    total_available_seconds = range_totals["available_seconds"]
+    days_worked = int(range_totals["days_worked"])
 
-        lunch_entry = agent_daily[
-            agent_daily["Service Presence Status: Developer Name"] == "Busy_Lunch"
-        ].sort_values(by="Start DT")
-        if not lunch_entry.empty and scheduled_shift_start is not None:
-            lunch_days_with_data += 1
-            lunch_start = lunch_entry.iloc[0]["Start DT"]
-            time_to_lunch = (lunch_start - scheduled_shift_start).total_seconds()
-            # Allow a 15-minute grace period either side of the 3–5 hour lunch window.
-            if time_to_lunch < (2 * 3600 + 45 * 60) or time_to_lunch > (5 * 3600 + 15 * 60):
-                lunch_days_out_of_window += 1
+    lunch_days_with_data = int(range_totals["lunch_days_with_data"])
+    lunch_days_out_of_window = int(range_totals["lunch_days_out_of_window"])
 
     if total_shift_seconds > 0:
         hours = int(total_shift_seconds // 3600)
@@ -764,34 +812,16 @@ else:
         lunch_text = "No Lunch Data"
         lunch_warning = False
 
-    col3, col4, col5 = st.columns(3)
-    with col3:
-        box_class = "metric-container-warning" if lunch_warning else "metric-container"
-        val_class = "metric-value" if lunch_warning else "metric-value-success"
-        st.markdown(f"""
-            <div class="{box_class}">
-                <div class="metric-title">Lunch Compliance</div>
-                <div class="{val_class}">{lunch_text}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col4:
-        st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Total Shift Time</div>
-                <div class="metric-value">{total_shift_display}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col5:
-        box_class = "metric-container-warning" if availability_warning else "metric-container"
-        val_class = "metric-value" if availability_warning else "metric-value-success"
-        st.markdown(f"""
-            <div class="{box_class}">
-                <div class="metric-title">Total Available Time</div>
-                <div class="{val_class}">{total_available_display}</div>
-            </div>
-        """, unsafe_allow_html=True)
+    st.markdown(
+        cards_html(
+            [
+                Card("Lunch Compliance", lunch_text, "warning" if lunch_warning else "success"),
+                Card("Total Shift Time", total_shift_display),
+                Card("Total Available Time", total_available_display, "warning" if availability_warning else "success"),
+            ]
+        ),
+        unsafe_allow_html=True,
+    )
 
     st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
 
@@ -800,232 +830,140 @@ else:
     # =========================================================
     st.markdown("### Per-Day Shift & Adherence")
 
-    per_day_rows = []
-
-    for d in day_list:
-        shift_col = d.strftime("%d/%m/%Y")
-        sched_shift = get_shift_value(agent_shift_row, shift_col)
-        day_type = classify_rota_day(sched_shift, d)
-
-        agent_daily = df_presence_agent_range[df_presence_agent_range["Start DT"].dt.date == d].copy()
-
-        if agent_daily.empty:
-            if day_type == "sick":
-                status = "Sick"
-            elif day_type == "scheduled":
-                status = "Absent (Scheduled)"
-            elif day_type == "manual_late":
-                status = "Late (Recorded)"
-            elif day_type == "other_event":
-                status = sched_shift
-            else:
-                status = "Day Off / Not Assigned"
-            per_day_rows.append(
-                {
-                    "Date": d.strftime("%d %b %Y"),
-                    "Scheduled Shift": sched_shift or "Not Assigned",
-                    "Actual Shift": "—",
-                    "Lunch Break": "—",
-                    "Late (min)": "",
-                    "Status": status,
-                }
-            )
-            continue
-
-        earliest = agent_daily["Start DT"].min()
-        latest = agent_daily["End DT"].max()
-        actual_shift_str = f"{earliest.strftime('%H:%M')}–{latest.strftime('%H:%M')}"
-
-        # Show the full recorded lunch break window and total duration.
-        lunch_segments = agent_daily[
-            agent_daily["Service Presence Status: Developer Name"] == "Busy_Lunch"
-        ].sort_values("Start DT")
-
-        if not lunch_segments.empty:
-            lunch_start = lunch_segments["Start DT"].min()
-            lunch_end = lunch_segments["End DT"].max()
-            lunch_seconds = (
-                lunch_segments["End DT"] - lunch_segments["Start DT"]
-            ).dt.total_seconds().clip(lower=0).sum()
-            lunch_minutes = int(round(lunch_seconds / 60))
-            lunch_break_str = (
-                f"{lunch_start.strftime('%H:%M')}–{lunch_end.strftime('%H:%M')} "
-                f"({lunch_minutes} min)"
-            )
-        else:
-            lunch_break_str = "—"
-
-        late_minutes = ""
-        status = "Worked"
-
-        if day_type == "sick":
-            status = "Sick (worked)"
-        elif day_type == "manual_late":
-            status = "Late (Recorded)"
-        elif day_type == "scheduled":
-            sched_start, _ = parse_shift_range(sched_shift, d)
-            if sched_start:
-                delay = (earliest - sched_start).total_seconds() / 60
-                if delay >= 5:
-                    late_minutes = int(delay)
-                    status = "Late"
-                else:
-                    status = "On Time"
-
-        per_day_rows.append(
-            {
-                "Date": d.strftime("%d %b %Y"),
-                "Scheduled Shift": sched_shift or "Not Assigned",
-                "Actual Shift": actual_shift_str,
-                "Lunch Break": lunch_break_str,
-                "Late (min)": late_minutes,
-                "Status": status,
-            }
-        )
-
-    if per_day_rows:
-        per_day_df = pd.DataFrame(per_day_rows)
-        # Coerce Late (min) to string to avoid Arrow int/str mix issues
-        per_day_df["Late (min)"] = per_day_df["Late (min)"].astype(str)
-        st.dataframe(per_day_df, width="stretch", hide_index=True)
+    if not view.per_day.empty:
+        st.dataframe(view.per_day, width="stretch", hide_index=True)
     else:
         st.info("No per-day shift data available for this range.")
 
 # =========================================================
-# Lateness – Last 30 Days (from end of selected range)
+# Lateness – lookback window (from end of selected range)
 # =========================================================
 st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
-st.markdown("### Lateness – Last 30 Days")
-
-anchor_date = end_date if isinstance(end_date, date_type) else pd.to_datetime(end_date).date()
+st.markdown(f"### Lateness – Last {lateness_lookback} Days")
 
-total_minutes_late = 0
-window_days = [anchor_date - timedelta(days=i) for i in range(0, 30)]
-lateness_incidents = []
-
-agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
+anchor_date = end_date
+history = get_agent_history_view(
+    data_version, agent, anchor_date, (lateness_lookback, absence_lookback, trend_lookback), trend_window, snapshot
+)
 
-for d in window_days:
-    shift_col = d.strftime("%d/%m/%Y")
-    sched_shift_d = get_shift_value(agent_shift_row, shift_col)
-    day_type_d = classify_rota_day(sched_shift_d, d)
+ROTA_MISSING_MESSAGE = "shifts.csv not found. Lateness and absence need the rota to compare against."
 
-    df_day_late_check = df_presence[
-        (df_presence["Created By: Full Name"] == agent)
-        & (df_presence["Start DT"].dt.date == d)
+if rota_model.empty:
+    st.info(ROTA_MISSING_MESSAGE)
+else:
+    total_minutes_late, late_df = history.total_minutes_late, history.late_df
+    late_benchmark = benchmark_html(
+        history.late_benchmarks,
+        "minutes_late",
+        metric_value(history.late_totals, "minutes_late"),
+        lambda minutes: f"{minutes:.0f} min",
+    )
+    lateness_incidents = [
+        Incident(d, "Recorded late" if math.isnan(m) else f"{int(m)} min late")
+        for d, m in zip(late_df["Date"], late_df["Minutes Late"].tolist())
     ]
 
-    if day_type_d == "manual_late":
-        lateness_incidents.append(
-            f"- **{d.strftime('%d %b %Y')}**: Recorded late"
+    if not lateness_incidents:
+        st.markdown(
+            empty_state_html(f"No lateness incidents in the last {lateness_lookback} days"), unsafe_allow_html=True
+        )
+    else:
+        # Card, heading and list go out as one Markdown block.
+        total_card = Card(
+            f"Total Lateness – Last {lateness_lookback} Days", f"{int(total_minutes_late)} min", "warning", late_benchmark
+        )
+        st.markdown(
+            "\n\n".join([cards_html([total_card]), "#### Lateness Incidents", incident_list_html(lateness_incidents)]),
+            unsafe_allow_html=True,
         )
-        continue
-
-    if not df_day_late_check.empty and day_type_d == "scheduled":
-        sched_start_d, _ = parse_shift_range(sched_shift_d, d)
-        actual_start_time_d = df_day_late_check["Start DT"].min()
-        if sched_start_d and actual_start_time_d:
-            delay = (actual_start_time_d - sched_start_d).total_seconds() / 60
-            if delay >= 5:
-                total_minutes_late += delay
-                lateness_incidents.append(
-                    f"- **{d.strftime('%d %b %Y')}**: {int(delay)} min late"
-                )
-
-if not lateness_incidents:
-    st.markdown("""
-        <div class="empty-state">
-            <div class="empty-state-label">No lateness incidents in the last 30 days</div>
-        </div>
-    """, unsafe_allow_html=True)
-else:
-    st.markdown(f"""
-        <div class="metric-container-warning">
-            <div class="metric-title">Total Lateness – Last 30 Days</div>
-            <div class="metric-value">{int(total_minutes_late)} min</div>
-        </div>
-    """, unsafe_allow_html=True)
-
-    st.markdown("#### Lateness Incidents")
-    items_html = "\n".join([
-        f'<li class="incident-item"><span class="incident-date">{inc.split("**: ")[0].replace("- **", "")}</span>'
-        f'<span class="incident-badge">{inc.split("**: ")[1]}</span></li>'
-        for inc in lateness_incidents
-    ])
-    st.markdown(f'<ul class="incident-list">{items_html}</ul>', unsafe_allow_html=True)
 
 # =========================================================
-# Absence – Last 90 Days (from end of selected range)
+# Absence – lookback window (from end of selected range)
 # =========================================================
 st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
-st.markdown("### Absence – Last 90 Days")
+st.markdown(f"### Absence – Last {absence_lookback} Days")
 
-abs_window = [anchor_date - timedelta(days=i) for i in range(0, 90)]
-absent_days = []
-sick_days = []
-
-agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
+if rota_model.empty:
+    st.info(ROTA_MISSING_MESSAGE)
+else:
+    absent_dates, sick_dates = history.absent_dates, history.sick_dates
 
-for d in abs_window:
-    shift_col_d = d.strftime("%d/%m/%Y")
-    sched_shift_d = get_shift_value(agent_shift_row, shift_col_d)
-    day_type_d = classify_rota_day(sched_shift_d, d)
+    if absent_dates.empty and sick_dates.empty:
+        st.markdown(
+            empty_state_html(f"No absences or sickness in the last {absence_lookback} days"), unsafe_allow_html=True
+        )
+    else:
+        blocks = [
+            cards_html([
+                Card(
+                    f"Absence Count – Last {absence_lookback} Days", len(absent_dates),
+                    "warning" if len(absent_dates) else "plain",
+                ),
+                Card(
+                    f"Sickness Count – Last {absence_lookback} Days", len(sick_dates),
+                    "warning" if len(sick_dates) else "plain",
+                ),
+            ])
+        ]
+        for heading, dates, badge in (
+            ("#### Absence Dates", absent_dates, "Absent"),
+            ("#### Sickness Dates", sick_dates, "Sick"),
+        ):
+            if len(dates):
+                blocks += [heading, incident_list_html(Incident(d, badge) for d in dates)]
+        st.markdown("\n\n".join(blocks), unsafe_allow_html=True)
 
-    if day_type_d == "sick":
-        sick_days.append(d.strftime("%d %b %Y"))
-        continue
+# =========================================================
+# Trends – rolling windows over the trend lookback
+# =========================================================
+st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+st.markdown(f"### Trends – Rolling {trend_window} Days, Last {trend_lookback} Days")
 
-    if day_type_d != "scheduled":
-        continue
+trend_charts = history.trend_charts
+for tab, (title, frame) in zip(st.tabs(list(trend_charts)), trend_charts.items()):
+    with tab:
+        trend_chart(frame, title)
 
-    df_day_presence = df_presence[
-        (df_presence["Created By: Full Name"] == agent)
-        & (df_presence["Start DT"].dt.date == d)
-    ]
-
-    if df_day_presence.empty:
-        absent_days.append(d.strftime("%d %b %Y"))
+# =========================================================
+# Staffing forecast – Erlang C against the rota (whole team)
+# =========================================================
+st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+st.markdown("### Staffing Forecast – Team")
 
-if not absent_days and not sick_days:
-    st.markdown("""
-        <div class="empty-state">
-            <div class="empty-state-label">No absences or sickness in the last 90 days</div>
-        </div>
-    """, unsafe_allow_html=True)
+if df_chat.empty or not {"Start DT", "Duration (s)"}.issubset(df_chat.columns) or rota_model.empty:
+    st.info("The staffing forecast needs chat_transcripts.csv and shifts.csv.")
 else:
-    col_abs, col_sick = st.columns(2)
-    with col_abs:
-        box_class = "metric-container-warning" if absent_days else "metric-container"
-        st.markdown(f"""
-            <div class="{box_class}">
-                <div class="metric-title">Absence Count – Last 90 Days</div>
-                <div class="metric-value">{len(absent_days)}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col_sick:
-        box_class = "metric-container-warning" if sick_days else "metric-container"
-        st.markdown(f"""
-            <div class="{box_class}">
-                <div class="metric-title">Sickness Count – Last 90 Days</div>
-                <div class="metric-value">{len(sick_days)}</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    if absent_days:
-        st.markdown("#### Absence Dates")
-        items_html = "\n".join([
-            f'<li class="incident-item"><span class="incident-date">{ad}</span>'
-            f'<span class="incident-badge">Absent</span></li>'
-            for ad in absent_days
-        ])
-        st.markdown(f'<ul class="incident-list">{items_html}</ul>', unsafe_allow_html=True)
-
-    if sick_days:
-        st.markdown("#### Sickness Dates")
-        items_html = "\n".join([
-            f'<li class="incident-item"><span class="incident-date">{sd}</span>'
-            f'<span class="incident-badge">Sick</span></li>'
-            for sd in sick_days
-        ])
-        st.markdown(f'<ul class="incident-list">{items_html}</ul>', unsafe_allow_html=True)
+    forecast_months = [
+        m.date() for m in pd.date_range(rota_model["Date"].min().replace(day=1), rota_model["Date"].max(), freq="MS")
+    ]
+    month_col, level_col, answer_col, concurrency_col = st.columns(4)
+    forecast_month = month_col.selectbox(
+        "Month", forecast_months, index=len(forecast_months) - 1, format_func=lambda m: m.strftime("%B %Y")
+    )
+    service_level = level_col.slider("Service level target (%)", 50, 99, 80)
+    answer_seconds = answer_col.number_input("Answered within (s)", min_value=10, max_value=600, value=60, step=10)
+    concurrency = concurrency_col.number_input("Chats per agent", min_value=1.0, max_value=4.0, value=1.0, step=0.25)
+
+    # The rota can end part-way through its last month; plan only the days it covers.
+    month_end = min(pd.Timestamp(forecast_month) + pd.offsets.MonthEnd(0), rota_model["Date"].max()).date()
+    plan, fitted_on = get_staffing_plan(
+        data_version, df_chat, rota_model, forecast_month, month_end, service_level / 100, answer_seconds, concurrency
+    )
+    short = plan[plan["Gap"] < 0]
+    st.markdown(
+        cards_html([
+            Card("Understaffed Intervals", f"{len(short)} / {len(plan)}", "warning" if len(short) else "success"),
+            Card("Largest Shortfall", f"{int(-short['Gap'].min()) if len(short) else 0} agents"),
+            Card("Required Agent-Hours", f"{plan['Required'].sum() / 4:,.0f}", "accent"),
+            Card("Scheduled Agent-Hours", f"{plan['Scheduled'].sum() / 4:,.0f}"),
+        ]),
+        unsafe_allow_html=True,
+    )
+    trend_chart(plan[["Required", "Scheduled"]], "Agents per 15 min")
+    st.caption(
+        f"Chat arrivals and AHT per weekday and 15-minute interval fitted on "
+        f"{fitted_on[0]:%d %b} – {fitted_on[1]:%d %b %Y}. Scheduled headcount counts everyone "
+        f"on shift, breaks included."
+    )
+
+mark_timing("complete")
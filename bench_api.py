@@ -0,0 +1,132 @@
+"""Load test for the export API.
+
+Usage: python bench_api.py [requests per scenario] [client threads]
+
+Starts ``api.py`` in a child process pinned to a single CPU core, waits for
+the first snapshot, then drives it over keep-alive connections and reports
+throughput and latency for three scenarios:
+
+    uncached      a different agent/range on every request (range sum + JSON)
+    cached        the same few requests again (serialized payload reused)
+    not_modified  conditional requests with a matching If-None-Match (304)
+"""
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+HOST = "127.0.0.1"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    pin = (lambda: os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})) if hasattr(os, "sched_setaffinity") else None
+    server = subprocess.Popen(
+        [sys.executable, "api.py", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, preexec_fn=pin,
+    )
+    for _ in range(600):
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=5)
+            conn.request("GET", "/api/agents")
+            response = conn.getresponse()
+            body = response.read()
+            if response.status == 200:
+                return server, json.loads(body)["agents"]
+        except OSError:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("export API did not come up")
+
+
+def run_scenario(port, targets, threads, etags=None):
+    """Issue every (target) once across ``threads`` keep-alive clients; return latencies in ms."""
+    latencies = []
+    lock = threading.Lock()
+    chunks = [targets[i::threads] for i in range(threads)]
+
+    def client(chunk):
+        conn = http.client.HTTPConnection(HOST, port, timeout=30)
+        local = []
+        for target in chunk:
+            headers = {"If-None-Match": etags[target]} if etags else {}
+            started = time.perf_counter()
+            conn.request("GET", target, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, time.perf_counter() - started
+
+
+def fetch_etags(port, targets):
+    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+    etags = {}
+    for target in targets:
+        conn.request("GET", target)
+        response = conn.getresponse()
+        response.read()
+        etags[target] = response.getheader("ETag")
+    conn.close()
+    return etags
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    port = free_port()
+    server, agents = start_server(port)
+    try:
+        conn = http.client.HTTPConnection(HOST, port)
+        conn.request("GET", "/api/team/metrics")
+        latest = date.fromisoformat(json.loads(conn.getresponse().read())["end"])
+        conn.close()
+
+        uncached = [
+            f"/api/agents/{quote(agents[i % len(agents)])}/metrics"
+            f"?start={latest - timedelta(days=6 + i // len(agents))}&end={latest}"
+            for i in range(count)
+        ]
+        repeated = [f"/api/agents/{quote(agent)}/metrics" for agent in agents]
+        cached = [repeated[i % len(repeated)] for i in range(count)]
+        etags = fetch_etags(port, repeated)
+
+        print(f"{count} requests per scenario, {threads} client threads, server pinned to one core")
+        print(f"{'scenario':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, targets, headers in (
+            ("uncached", uncached, None),
+            ("cached", cached, None),
+            ("not_modified", cached, etags),
+        ):
+            latencies, elapsed = run_scenario(port, targets, threads, headers)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{name:<14}{len(latencies) / elapsed:>10.0f}{statistics.median(latencies):>10.2f}{p95:>10.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Startup benchmark for the dashboard.
+
+Usage: python bench_startup.py [runs]
+
+Each run starts a fresh interpreter so the shared data store is cold, executes
+app.py once headlessly through Streamlit's AppTest, and reports the stage
+timings app.py records in ``st.session_state["run_timings"]`` (milliseconds
+from the start of the script run):
+
+    first_paint      header skeleton sent, before any data is read
+    presence_loaded  agent list and date bounds available
+    data_loaded      items and chat transcripts parsed
+    complete         every section rendered
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=300)
+at.run()
+timings = dict(at.session_state["run_timings"])
+timings["streamlit_import"] = round((imported - started) * 1000, 1)
+timings["process_total"] = round((time.perf_counter() - started) * 1000, 1)
+timings["exceptions"] = len(at.exception)
+print(json.dumps(timings))
+"""
+
+STAGES = ["streamlit_import", "first_paint", "presence_loaded", "data_loaded", "complete", "process_total"]
+
+
+def run_once():
+    result = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [run_once() for _ in range(runs)]
+    if any(r["exceptions"] for r in results):
+        print("warning: app.py raised during at least one run")
+
+    print(f"{'stage':<18}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for stage in STAGES:
+        values = [r[stage] for r in results if stage in r]
+        if values:
+            print(f"{stage:<18}{statistics.median(values):>12.1f}{min(values):>12.1f}{max(values):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Team distributions an agent's metrics are ranked against.
+
+Everything here is built once per data version from the per-day metric table
+of every agent, so a metric card only needs a binary search into an already
+sorted array instead of recomputing the rest of the team.
+"""
+import numpy as np
+import pandas as pd
+
+from metrics import daily_metric_table, late_minutes
+
+LONG_CHAT_THRESHOLD_SECONDS = 15 * 60
+
+# metric -> (numerator, denominator, eligibility field). Ratios divide the
+# summed numerator by the summed denominator; counts have no denominator. An
+# agent only enters a period's distribution when the eligibility field is
+# positive, so days off do not drag the team down.
+BENCHMARK_METRICS = {
+    "aht_chat": ("chat_seconds", "chat_items", "chat_items"),
+    "aht_email": ("email_seconds", "email_items", "email_items"),
+    "shift_utilisation": ("handling_seconds", "available_seconds_exact", "available_seconds_exact"),
+    "chat_utilisation": ("chat_handling_seconds", "chat_available_seconds", "chat_available_seconds"),
+    "email_utilisation": ("email_handling_seconds", "email_available_seconds", "email_available_seconds"),
+    "occupancy": ("weighted_load_seconds", "available_seconds_exact", "available_seconds_exact"),
+    "idle_share": ("idle_seconds", "online_seconds", "online_seconds"),
+    "at_capacity_share": ("at_capacity_seconds", "online_seconds", "online_seconds"),
+    "away_time": ("away_seconds", None, "days_worked"),
+    "long_chats": ("long_chats", None, "days_worked"),
+    "minutes_late": ("minutes_late", None, "scheduled_days"),
+}
+
+
+def metric_value(totals, metric):
+    """One agent's value for ``metric`` from summed daily fields, or None when not eligible."""
+    numerator, denominator, eligible = BENCHMARK_METRICS[metric]
+    if not totals[eligible] > 0:
+        return None
+    return totals[numerator] / totals[denominator] if denominator else totals[numerator]
+
+
+def metric_values(table, metric):
+    """``metric_value`` for every row of a table of summed fields (NaN when not eligible)."""
+    numerator, denominator, eligible = BENCHMARK_METRICS[metric]
+    values = table[numerator].to_numpy(dtype=float)
+    if denominator:
+        totals = table[denominator].to_numpy(dtype=float)
+        values = np.divide(values, totals, out=np.full(len(values), np.nan), where=totals > 0)
+    return pd.Series(np.where(table[eligible].to_numpy() > 0, values, np.nan), index=table.index)
+
+
+def percentile_rank(sorted_values, value):
+    """Percentage of the team below ``value``, counting ties as half.
+
+    Values within a relative 1e-9 count as ties, so sums taken in a
+    different order still rank an agent level with themselves.
+    """
+    tolerance = 1e-9 * max(1.0, abs(value))
+    below = np.searchsorted(sorted_values, value - tolerance, side="left")
+    at_or_below = np.searchsorted(sorted_values, value + tolerance, side="right")
+    return 100.0 * (below + at_or_below) / (2 * len(sorted_values))
+
+
+def team_median(sorted_values):
+    return float(np.median(sorted_values))
+
+
+def _distributions(table):
+    """period -> {metric: sorted values} for a table indexed by (Agent, period)."""
+    periods = table.index.get_level_values(1)
+    result = {period: {} for period in periods.unique()}
+    for metric in BENCHMARK_METRICS:
+        values = metric_values(table, metric).to_numpy()
+        keep = ~np.isnan(values)
+        codes, uniques = pd.factorize(periods[keep])
+        order = np.lexsort((values[keep], codes))
+        parts = np.split(values[keep][order], np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1])
+        for period, part in zip(uniques, parts):
+            result[period][metric] = part
+    return result
+
+
+class TeamBenchmarks:
+    """Per-agent daily metrics for the whole team and the distributions built from them.
+
+    ``daily`` has one row per (agent, day) over a contiguous run of days, as
+    built by ``daily_metric_table``. Distributions for every single day and
+    every Monday-to-Sunday week are sorted up front. Any other range is
+    summed from per-agent prefix sums, which costs the same for a week or a
+    year.
+    """
+
+    def __init__(self, daily):
+        self.daily = daily
+        agents = daily.index.get_level_values("Agent")
+        days = daily.index.get_level_values("Day")
+        self.agents = list(agents.unique())
+        self.days = days.unique()
+        week_starts = days - pd.to_timedelta(days.dayofweek, unit="D")
+        self.by_day = _distributions(daily)
+        self.by_week = _distributions(daily.groupby([agents, week_starts]).sum())
+
+        values = daily.to_numpy(dtype=float).reshape(len(self.agents), len(self.days), daily.shape[1])
+        self._prefix = np.concatenate([np.zeros((len(self.agents), 1, daily.shape[1])), values.cumsum(axis=1)], axis=1)
+
+    def range_totals(self, start, end):
+        """Summed daily fields per agent over the inclusive date range ``start``..``end``."""
+        lo = self.days.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.days.searchsorted(pd.Timestamp(end), side="right")
+        return pd.DataFrame(
+            self._prefix[:, max(hi, lo)] - self._prefix[:, lo],
+            index=pd.Index(self.agents, name="Agent"),
+            columns=self.daily.columns,
+        )
+
+    def distribution(self, start, end):
+        """{metric: sorted team values} for the inclusive date range ``start``..``end``."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if start == end:
+            return self.by_day.get(start, {})
+        if start.dayofweek == 0 and end - start == pd.Timedelta(days=6):
+            return self.by_week.get(start, {})
+        totals = self.range_totals(start, end)
+        distribution = {}
+        for metric in BENCHMARK_METRICS:
+            values = metric_values(totals, metric).dropna().to_numpy()
+            if len(values):
+                distribution[metric] = np.sort(values)
+        return distribution
+
+
+def build_team_benchmarks(items_days, presence_days, df_chat, rota, first_logins, agents):
+    """Daily metrics, long chats and lateness for every agent in ``agents``.
+
+    The table spans every day covered by presence or the rota.
+    """
+    bounds = [presence_days["Day"].min(), presence_days["Day"].max(), rota["Date"].min(), rota["Date"].max()]
+    bounds = [b for b in bounds if pd.notna(b)]
+    days = [d.date() for d in pd.date_range(min(bounds), max(bounds), freq="D")] if bounds else []
+    daily = daily_metric_table(items_days, presence_days, rota, agents, days)
+    index = daily.index
+
+    if {"Agent Name", "Start DT", "Duration (s)"}.issubset(df_chat.columns):
+        long_chats = df_chat[df_chat["Duration (s)"] >= LONG_CHAT_THRESHOLD_SECONDS]
+        counts = long_chats.groupby([long_chats["Agent Name"], long_chats["Start DT"].dt.normalize()]).size()
+        daily["long_chats"] = counts.rename_axis(["Agent", "Day"]).reindex(index, fill_value=0)
+    else:
+        daily["long_chats"] = 0
+
+    names = pd.Series(list(agents), index=[a.lower() for a in agents])
+    rota = rota[rota["Agent Key"].isin(names.index)]
+    rota = rota.assign(Agent=names.reindex(rota["Agent Key"]).to_numpy()).merge(
+        first_logins, on=["Agent", "Date"], how="left"
+    )
+    rota = rota.set_index(["Agent", "Date"]).rename_axis(["Agent", "Day"])
+    daily["minutes_late"] = late_minutes(rota).fillna(0.0).reindex(index, fill_value=0.0)
+    daily["scheduled_days"] = (rota["Day Type"] == "scheduled").astype(int).reindex(index, fill_value=0)
+    return TeamBenchmarks(daily)
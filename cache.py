@@ -0,0 +1,94 @@
+"""Process-wide result caches shared by every dashboard session."""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+def file_fingerprint(paths):
+    """Return a short version string that changes whenever any input file changes."""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        except OSError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()[:12]
+
+
+def _approx_size(value):
+    """Rough in-memory size of a cached row (a flat dict of scalars)."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class DailyResultCache:
+    """LRU cache of per-day metric rows, bounded by an approximate memory budget.
+
+    Entries are keyed on ``(key, day)`` where ``key`` identifies the agent and
+    data version. A date range is assembled from whatever days are already
+    cached and only the missing days are computed, so sliding or widening the
+    range costs just the new days.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get_range(self, key, days, compute):
+        """Return one row per day in ``days``, computing only the uncached ones.
+
+        ``compute(missing_days)`` must return a dict mapping each missing day
+        to its row.
+        """
+        rows = {}
+        with self._lock:
+            for day in days:
+                entry = self._entries.get((key, day))
+                if entry is not None:
+                    self._entries.move_to_end((key, day))
+                    rows[day] = entry[0]
+            self.hits += len(rows)
+
+        missing = [day for day in days if day not in rows]
+        if missing:
+            computed = compute(missing)
+            with self._lock:
+                self.misses += len(missing)
+                for day in missing:
+                    self._put((key, day), computed[day])
+            rows.update(computed)
+
+        return [rows[day] for day in days]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put(self, cache_key, row):
+        size = _approx_size(row)
+        old = self._entries.pop(cache_key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[cache_key] = (row, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
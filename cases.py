@@ -0,0 +1,192 @@
+"""Join index linking chat transcripts, email cases and survey responses.
+
+Built once per data version at ingest. Each map goes from a case number or a
+customer email to row positions in the source frame, so a drill-down or a
+per-agent lookup is a dictionary hit rather than a scan of the exports.
+
+A row can only be linked when its export carries a key: chats always have a
+case number, but survey and email exports only link when they include a
+case number (or, for emails, an owner or a customer email that also appears
+on a chat).
+"""
+import numpy as np
+import pandas as pd
+
+CASE_COLUMN = "Case Number"
+CUSTOMER_COLUMN = "Customer Email"
+SATISFACTION_QUESTION = "How satisfied were you"
+RESOLVED_QUESTION = "resolved by the agent"
+
+NO_ROWS = np.array([], dtype=int)
+
+
+def case_key(value):
+    """``case_keys`` for a single value."""
+    if pd.isna(value):
+        return None
+    key = str(value).strip()
+    return key[:-2] if key.endswith(".0") else key
+
+
+def case_keys(values):
+    """Case numbers as plain strings ("3967121", not "3967121.0"); missing stays NaN."""
+    keys = values.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    return keys.where(values.notna() & (keys != ""))
+
+
+def customer_keys(values):
+    keys = values.astype(str).str.strip().str.lower()
+    return keys.where(values.notna() & (keys != ""))
+
+
+def _positions(keys):
+    """key -> array of row positions for every non-missing key of a Series."""
+    keys = pd.Series(keys)
+    valid = keys.notna().to_numpy()
+    rows = np.flatnonzero(valid)
+    codes, uniques = pd.factorize(keys[valid])
+    rows = rows[np.argsort(codes, kind="stable")]
+    ends = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+    starts = ends - np.bincount(codes, minlength=len(uniques))
+    return {key: rows[a:b] for key, a, b in zip(list(uniques), starts.tolist(), ends.tolist())}
+
+
+def _column(df, *candidates):
+    """First column whose name contains one of ``candidates``, or None."""
+    return next((col for cand in candidates for col in df.columns if cand in col), None)
+
+
+def survey_scores(df_survey):
+    """Satisfaction score (1-5) and resolved flag per response row; NaN for other questions."""
+    question = df_survey["Survey Question: Question Title"].astype(str)
+    response = df_survey["Response"].astype(str)
+    score = pd.to_numeric(response.str.extract(r"^(\d+)", expand=False), errors="coerce")
+    resolved = response.str.strip().str.lower().map({"yes": 1.0, "no": 0.0})
+    return pd.DataFrame({
+        "Score": score.where(question.str.contains(SATISFACTION_QUESTION, regex=False)),
+        "Resolved": resolved.where(question.str.contains(RESOLVED_QUESTION, regex=False)),
+    }, index=df_survey.index)
+
+
+def _email_agents(df_email, chats, case_agent):
+    """Handling agent per email case: owner column, then case number, then the
+    agent of the customer's last chat at or before the case was opened."""
+    agent = pd.Series(np.nan, index=df_email.index, dtype=object)
+    owner = _column(df_email, "Owner: Full Name", "Case Owner")
+    if owner:
+        agent = df_email[owner].astype(str).str.strip().where(df_email[owner].notna())
+    if CASE_COLUMN in df_email.columns:
+        agent = agent.fillna(case_keys(df_email[CASE_COLUMN]).map(case_agent))
+    linkable = {CUSTOMER_COLUMN, "Opened DT"}.issubset(df_email.columns) and CUSTOMER_COLUMN in chats.columns
+    if linkable and agent.isna().any():
+        pending = df_email[agent.isna()].dropna(subset=["Opened DT"])
+        pending = pending.assign(
+            **{CUSTOMER_COLUMN: customer_keys(pending[CUSTOMER_COLUMN]), "_row": pending.index}
+        ).dropna(subset=[CUSTOMER_COLUMN]).sort_values("Opened DT")
+        handled = chats.dropna(subset=[CUSTOMER_COLUMN, "Start DT"]).sort_values("Start DT")
+        matched = pd.merge_asof(
+            pending[["_row", "Opened DT", CUSTOMER_COLUMN]],
+            handled[["Start DT", CUSTOMER_COLUMN, "Agent Name"]],
+            left_on="Opened DT", right_on="Start DT", by=CUSTOMER_COLUMN, direction="backward",
+        )
+        agent = agent.fillna(matched.set_index("_row")["Agent Name"])
+    return agent
+
+
+class CaseIndex:
+    """Hash maps over the chat, email and survey exports of one data version.
+
+    ``chats_by_case`` / ``chats_by_customer`` / ``emails_by_case`` /
+    ``emails_by_customer`` / ``surveys_by_case`` map a key to row positions; ``surveys_by_agent`` and
+    ``emails_by_agent`` hold the rows attributed to each handling agent.
+    """
+
+    def __init__(self, df_chat, df_email, df_survey):
+        self.chats = df_chat.reset_index(drop=True)
+        self.emails = df_email.reset_index(drop=True)
+        self.surveys = df_survey.reset_index(drop=True)
+
+        chats = self.chats
+        if CASE_COLUMN in chats.columns:
+            chats = chats.assign(**{CASE_COLUMN: case_keys(chats[CASE_COLUMN])})
+        customer = _column(chats, "Visitor Email", "Email Address")
+        if customer:
+            chats = chats.assign(**{CUSTOMER_COLUMN: customer_keys(chats[customer])})
+        self.chats_by_case = _positions(chats[CASE_COLUMN]) if CASE_COLUMN in chats.columns else {}
+        self.chats_by_customer = _positions(chats[CUSTOMER_COLUMN]) if customer else {}
+
+        # The case's most recent chat decides who handled it.
+        case_agent = {}
+        if self.chats_by_case and {"Agent Name", "Start DT"}.issubset(chats.columns):
+            latest = chats.dropna(subset=[CASE_COLUMN]).sort_values("Start DT", kind="stable")
+            latest = latest.drop_duplicates(CASE_COLUMN, keep="last")
+            case_agent = dict(zip(latest[CASE_COLUMN].tolist(), latest["Agent Name"].tolist()))
+        self.case_agent = case_agent
+
+        emails = self.emails
+        self.emails_by_case = _positions(case_keys(emails[CASE_COLUMN])) if CASE_COLUMN in emails.columns else {}
+        if CUSTOMER_COLUMN in emails.columns:
+            self.emails_by_customer = _positions(customer_keys(emails[CUSTOMER_COLUMN]))
+        else:
+            self.emails_by_customer = {}
+        if not emails.empty and "Agent Name" in chats.columns:
+            self.emails = emails.assign(Agent=_email_agents(emails, chats, self.case_agent))
+        else:
+            self.emails = emails.assign(Agent=pd.Series(np.nan, index=emails.index, dtype=object))
+        self.emails_by_agent = _positions(self.emails["Agent"])
+
+        surveys = self.surveys
+        if CASE_COLUMN in surveys.columns:
+            survey_cases = case_keys(surveys[CASE_COLUMN])
+            self.surveys_by_case = _positions(survey_cases)
+            agent = survey_cases.map(self.case_agent)
+        else:
+            self.surveys_by_case = {}
+            agent = pd.Series(np.nan, index=surveys.index, dtype=object)
+        if {"Survey Question: Question Title", "Response"}.issubset(surveys.columns):
+            surveys = surveys.join(survey_scores(surveys))
+        self.surveys = surveys.assign(Agent=agent)
+        self.surveys_by_agent = _positions(self.surveys["Agent"])
+
+    @staticmethod
+    def _rows(frame, positions):
+        return frame.iloc[positions if positions is not None else NO_ROWS]
+
+    def related(self, case_number):
+        """{"Chats", "Emails", "Surveys"} frames linked to one case, by key lookups only."""
+        case = case_key(case_number)
+        chats = self._rows(self.chats, self.chats_by_case.get(case))
+        customers = set()
+        if self.chats_by_customer:
+            customer = _column(self.chats, "Visitor Email", "Email Address")
+            customers = set(customer_keys(chats[customer]).dropna())
+        email_rows = [self.emails_by_case.get(case, NO_ROWS)]
+        email_rows += [self.emails_by_customer[c] for c in customers if c in self.emails_by_customer]
+        return {
+            "Chats": chats,
+            "Emails": self._rows(self.emails, np.unique(np.concatenate(email_rows))),
+            "Surveys": self._rows(self.surveys, self.surveys_by_case.get(case)),
+        }
+
+    @staticmethod
+    def _in_range(rows, column, start, end):
+        if rows.empty or column not in rows.columns:
+            return rows
+        return rows[rows[column].dt.date.between(start, end)]
+
+    def agent_surveys(self, agent, start, end):
+        """Survey responses attributed to ``agent`` and created in ``start``..``end``."""
+        return self._in_range(self._rows(self.surveys, self.surveys_by_agent.get(agent)), "Created DT", start, end)
+
+    def agent_emails(self, agent, start, end):
+        """Email cases attributed to ``agent`` and opened in ``start``..``end``."""
+        return self._in_range(self._rows(self.emails, self.emails_by_agent.get(agent)), "Opened DT", start, end)
+
+    def coverage(self):
+        """How many survey responses and email cases could be tied to an agent."""
+        return {
+            "surveys": len(self.surveys),
+            "surveys_linked": int(self.surveys["Agent"].notna().sum()),
+            "emails": len(self.emails),
+            "emails_linked": int(self.emails["Agent"].notna().sum()),
+        }
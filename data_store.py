@@ -0,0 +1,346 @@
+"""Data loading and the shared, versioned snapshot every session reads from."""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+from benchmarks import build_team_benchmarks
+from cache import file_fingerprint
+from cases import CASE_COLUMN, CUSTOMER_COLUMN, CaseIndex
+from metrics import build_rota_model, first_login_by_day, split_at_midnight
+
+logger = logging.getLogger(__name__)
+
+# Try common alternative filenames in case the chat export was uploaded differently.
+CHAT_FILE_ALTERNATIVES = ["chat_transcript.csv", "chat.csv", "transcripts.csv", "report1771339850121.csv"]
+
+DATA_FILES = [
+    "report_items.csv",
+    "report_presence.csv",
+    "shifts.csv",
+    "chat_transcripts.csv",
+    *CHAT_FILE_ALTERNATIVES,
+    "email.csv",
+    "survey.csv",
+]
+
+# Agents who have left the company; hidden from the agent list and the team.
+LEFT_COMPANY = [
+    "Atuweni Masangano",
+    "Dorah Mwase",
+    "Jonathan Mandala",
+    "Lindah Sewero",
+    "Shiellah Phuka",
+]
+
+
+# -----------------------------
+# Data loading helpers
+# -----------------------------
+def safe_read_csv(path, **kwargs):
+    """Read a CSV and gracefully handle empty or missing files."""
+    try:
+        return pd.read_csv(path, **kwargs)
+    except (EmptyDataError, FileNotFoundError):
+        return pd.DataFrame()
+
+
+def _empty_frame(text_cols, datetime_cols=()):
+    """Zero-row frame with the columns downstream code filters on."""
+    columns = {col: pd.Series(dtype=object) for col in text_cols}
+    columns.update({col: pd.Series(dtype="datetime64[ns]") for col in datetime_cols})
+    return pd.DataFrame(columns)
+
+
+def load_items():
+    df_items = safe_read_csv("report_items.csv", dayfirst=True)
+    if df_items.empty:
+        return _empty_frame(["User: Full Name", "Service Channel: Developer Name"], ["Start DT", "End DT"])
+    df_items["Start DT"] = pd.to_datetime(df_items["Start DT"], dayfirst=True, errors="coerce")
+    df_items["End DT"] = pd.to_datetime(df_items["End DT"], dayfirst=True, errors="coerce")
+    df_items["User: Full Name"] = df_items["User: Full Name"].astype(str).str.strip()
+    df_items["Service Channel: Developer Name"] = df_items["Service Channel: Developer Name"].astype(str).str.strip()
+    return df_items
+
+
+def load_presence():
+    df_presence = safe_read_csv("report_presence.csv", dayfirst=True)
+    if not df_presence.empty:
+        df_presence["Start DT"] = pd.to_datetime(df_presence["Start DT"], dayfirst=True, errors="coerce")
+        df_presence["End DT"] = pd.to_datetime(df_presence["End DT"], dayfirst=True, errors="coerce")
+        df_presence["Created By: Full Name"] = df_presence["Created By: Full Name"].astype(str).str.strip()
+        df_presence["Service Presence Status: Developer Name"] = df_presence["Service Presence Status: Developer Name"].astype(str).str.strip()
+    return df_presence
+
+
+def load_shifts():
+    df_shifts = safe_read_csv("shifts.csv")
+    if "Column1" in df_shifts.columns and "Agent Name" not in df_shifts.columns:
+        df_shifts.rename(columns={"Column1": "Agent Name"}, inplace=True)
+    if "Agent Name" not in df_shifts.columns:
+        return _empty_frame(["Agent Name"])
+    df_shifts["Agent Name"] = df_shifts["Agent Name"].astype(str).str.strip()
+    return df_shifts
+
+
+def load_chat():
+    """Chat transcripts — one row per conversation, with exact start/end times."""
+    df_chat = safe_read_csv("chat_transcripts.csv")
+    if df_chat.empty:
+        for alt in CHAT_FILE_ALTERNATIVES:
+            df_chat = safe_read_csv(alt)
+            if not df_chat.empty:
+                break
+    if df_chat.empty:
+        return df_chat
+
+    # Brute-force clean every column name: remove BOM, strip whitespace,
+    # then build a lookup that matches regardless of BOM or encoding quirks
+    clean = {col: col.encode("utf-8").decode("utf-8-sig").strip() for col in df_chat.columns}
+    df_chat.rename(columns=clean, inplace=True)
+
+    # Now find the agent column — it may be "Owner: Full Name" or a BOM variant
+    agent_col = next((c for c in df_chat.columns if "Full Name" in c), None)
+    if agent_col and agent_col != "Agent Name":
+        df_chat.rename(columns={agent_col: "Agent Name"}, inplace=True)
+
+    # Normalise Case Number column
+    case_col = next((c for c in df_chat.columns if "Case Number" in c), None)
+    if case_col and case_col != "Case Number":
+        df_chat.rename(columns={case_col: "Case Number"}, inplace=True)
+
+    if "Agent Name" in df_chat.columns:
+        df_chat["Agent Name"] = df_chat["Agent Name"].astype(str).str.strip()
+    if "Start Time" in df_chat.columns:
+        df_chat["Start DT"] = pd.to_datetime(df_chat["Start Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
+    if "End Time" in df_chat.columns:
+        df_chat["End DT"] = pd.to_datetime(df_chat["End Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
+    if "Start DT" in df_chat.columns and "End DT" in df_chat.columns:
+        df_chat["Duration (s)"] = (df_chat["End DT"] - df_chat["Start DT"]).dt.total_seconds()
+        # Drop abandoned chats (zero/null duration — visitor left before agent responded)
+        df_chat = df_chat[
+            df_chat["Start DT"].notna() &
+            df_chat["End DT"].notna() &
+            (df_chat["Duration (s)"] > 0)
+        ].copy()
+    return df_chat
+
+
+def load_emails():
+    df_email = safe_read_csv("email.csv")
+    if df_email.empty:
+        return df_email
+    df_email.rename(columns={c: c.strip() for c in df_email.columns}, inplace=True)
+    customer_col = next((c for c in df_email.columns if "Email Address" in c), None)
+    if customer_col:
+        df_email.rename(columns={customer_col: CUSTOMER_COLUMN}, inplace=True)
+    case_col = next((c for c in df_email.columns if "Case Number" in c), None)
+    if case_col:
+        df_email.rename(columns={case_col: CASE_COLUMN}, inplace=True)
+    for source, target in (("Date/Time Opened", "Opened DT"), ("Target Date", "Target DT"), ("Completion Date", "Completed DT")):
+        if source in df_email.columns:
+            df_email[target] = pd.to_datetime(df_email[source], format="%d/%m/%Y, %H:%M", errors="coerce")
+    if {"Target DT", "Completed DT"}.issubset(df_email.columns):
+        df_email["Met SLA"] = (df_email["Completed DT"] <= df_email["Target DT"]).where(
+            df_email["Completed DT"].notna() & df_email["Target DT"].notna()
+        )
+    return df_email
+
+
+def load_surveys():
+    df_survey = safe_read_csv("survey.csv")
+    if df_survey.empty:
+        return df_survey
+    df_survey.rename(columns={c: c.strip() for c in df_survey.columns}, inplace=True)
+    case_col = next((c for c in df_survey.columns if "Case Number" in c), None)
+    if case_col:
+        df_survey.rename(columns={case_col: CASE_COLUMN}, inplace=True)
+    if "Survey Taker: Created Date" in df_survey.columns:
+        df_survey["Created DT"] = pd.to_datetime(df_survey["Survey Taker: Created Date"], format="%d/%m/%Y", errors="coerce")
+    return df_survey
+
+
+def load_data():
+    return load_items(), load_presence(), load_shifts(), load_chat()
+
+
+def load_case_exports():
+    return load_emails(), load_surveys()
+
+
+def active_agents(df_presence):
+    """Sorted names of agents with presence data, excluding those who have left."""
+    if "Created By: Full Name" not in df_presence.columns:
+        return []
+    agents = sorted(df_presence["Created By: Full Name"].dropna().unique())
+    return [a for a in agents if a not in LEFT_COMPANY]
+
+
+# -----------------------------
+# Versioned snapshots
+# -----------------------------
+# presence_days/items_days are the split_at_midnight tables and rota_model,
+# first_logins and team the tables derived from them; cases is the join
+# index over chats, email cases and surveys. All are built once here, off the
+# request path, and shared by every dashboard session and the export API.
+# complete is False for the presence-only first stage of a staged load.
+DataSnapshot = namedtuple(
+    "DataSnapshot",
+    [
+        "version", "loaded_at", "df_items", "df_presence", "df_shifts", "df_chat",
+        "presence_days", "items_days", "rota_model", "first_logins", "team", "cases", "complete",
+    ],
+)
+
+
+def _presence_snapshot(version, df_presence, df_shifts):
+    """Snapshot holding only what can be derived from presence and the rota."""
+    presence_days = split_at_midnight(df_presence)
+    return DataSnapshot(
+        version, time.time(), None, df_presence, df_shifts, None,
+        presence_days, None, build_rota_model(df_shifts), first_login_by_day(presence_days), None, None, False,
+    )
+
+
+def _complete_snapshot(partial, df_items, df_chat, df_email, df_survey):
+    items_days = split_at_midnight(df_items)
+    team = build_team_benchmarks(
+        items_days, partial.presence_days, df_chat, partial.rota_model, partial.first_logins,
+        active_agents(partial.df_presence),
+    )
+    cases = CaseIndex(df_chat, df_email, df_survey)
+    return partial._replace(
+        df_items=df_items, df_chat=df_chat, items_days=items_days, team=team, cases=cases, complete=True
+    )
+
+
+def load_snapshot(version=None):
+    """Parse every export into a new immutable snapshot."""
+    version = version or file_fingerprint(DATA_FILES)
+    df_items, df_presence, df_shifts, df_chat = load_data()
+    return _complete_snapshot(
+        _presence_snapshot(version, df_presence, df_shifts), df_items, df_chat, *load_case_exports()
+    )
+
+
+class DataStore:
+    """Holds the current data snapshot and hot-reloads it when exports change.
+
+    Readers take ``store.snapshot`` once per run and use only that object, so
+    they always see one consistent version. The worker thread parses changed
+    files off the request path and swaps in the new snapshot with a single
+    reference assignment; a file is only parsed once its fingerprint has been
+    stable for one poll, so half-written exports are not picked up.
+
+    The first load is staged: presence and shifts are published first (with
+    ``df_items``, ``df_chat``, ``items_days``, ``team`` and ``cases`` still None) and
+    ``presence_ready`` is set, then the same version is republished complete
+    and ``ready`` is set. If the second stage fails, ``ready`` is still set
+    but the snapshot stays incomplete with ``last_error`` explaining why, and
+    the watcher retries the second stage on every poll until it succeeds or
+    new exports are loaded in full.
+    """
+
+    def __init__(self, poll_seconds=5.0):
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self.presence_ready = threading.Event()
+        self.ready = threading.Event()
+        self._failed_version = None
+        self._snapshot = None
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def refresh(self, version=None):
+        """Reload now if the exports differ from the current snapshot; return True if swapped."""
+        version = version or file_fingerprint(DATA_FILES)
+        current = self._snapshot.version if self._snapshot else None
+        if version in (current, self._failed_version):
+            return False
+        with self._swap_lock:
+            current = self._snapshot.version if self._snapshot else None
+            if version in (current, self._failed_version):
+                return False
+            try:
+                snapshot = load_snapshot(version)
+            except Exception as exc:  # keep serving the previous version
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                self._failed_version = version
+                logger.warning("Reload of data version %s failed: %s", version, self.last_error)
+                return False
+            self.last_error = None
+            self._failed_version = None
+            self._snapshot = snapshot
+            logger.info("Swapped in data version %s", version)
+            return True
+
+    def start(self):
+        """Load the first snapshot in the background, then keep watching for changes."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if self._snapshot is None:
+            self._initial_load()
+        self._watch()
+
+    def _initial_load(self):
+        version = file_fingerprint(DATA_FILES)
+        try:
+            with self._swap_lock:
+                self._snapshot = _presence_snapshot(version, load_presence(), load_shifts())
+        except Exception as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            self._failed_version = version
+            logger.warning("Initial load of data version %s failed: %s", version, self.last_error)
+        else:
+            self.presence_ready.set()
+            self._finish_load()
+        finally:
+            self.presence_ready.set()
+            self.ready.set()
+
+    def _finish_load(self):
+        """Complete a presence-only snapshot in place; on failure it stays incomplete."""
+        with self._swap_lock:
+            partial = self._snapshot
+            try:
+                self._snapshot = _complete_snapshot(partial, load_items(), load_chat(), *load_case_exports())
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                logger.warning("Loading the rest of data version %s failed: %s", partial.version, self.last_error)
+                return
+            self.last_error = None
+            logger.info("Completed data version %s", partial.version)
+
+    def _watch(self):
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            version = file_fingerprint(DATA_FILES)
+            current = self._snapshot.version if self._snapshot else None
+            if version == current and not self._snapshot.complete:
+                pending = None
+                self._finish_load()
+            elif version == current:
+                # Files are back to what is being served, e.g. a bad export was reverted.
+                pending = None
+                self.last_error = self._failed_version = None
+            elif version == pending:
+                self.refresh(version)
+                pending = None
+            else:
+                pending = version
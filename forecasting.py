@@ -0,0 +1,138 @@
+"""Chat arrival forecasts and Erlang C staffing compared with the rota.
+
+Arrivals and average handle time are fitted per weekday × 15-minute
+interval from the chat transcripts, required agents are solved for all
+7 × 96 cells at once, and scheduled headcount is swept from the rota with a
+difference array. A month of intervals is a handful of array operations, so
+the plan can be recomputed whenever a setting changes.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+INTERVAL_MINUTES = 15
+INTERVAL = pd.Timedelta(minutes=INTERVAL_MINUTES)
+INTERVAL_SECONDS = INTERVAL_MINUTES * 60
+INTERVALS_PER_DAY = 24 * 60 // INTERVAL_MINUTES
+HISTORY_WEEKS = 8
+MAX_SERVERS = 500
+
+# arrivals/aht are (7, INTERVALS_PER_DAY) arrays indexed by (weekday, interval
+# of day); start/end are the inclusive dates they were fitted on.
+ArrivalProfile = namedtuple("ArrivalProfile", ["arrivals", "aht", "start", "end"])
+
+
+def _slots(timestamps):
+    """weekday * INTERVALS_PER_DAY + interval of day, for each timestamp."""
+    timestamps = pd.DatetimeIndex(timestamps)
+    interval = (timestamps.hour * 60 + timestamps.minute) // INTERVAL_MINUTES
+    return np.asarray(timestamps.dayofweek * INTERVALS_PER_DAY + interval)
+
+
+def history_window(df_chat, start, weeks=HISTORY_WEEKS):
+    """Inclusive dates of the ``weeks`` of chats to fit a forecast starting on ``start``.
+
+    Normally the weeks just before ``start``; when there are no chats that
+    far back, the latest ``weeks`` of chats instead.
+    """
+    start = pd.Timestamp(start)
+    first, last = df_chat["Start DT"].min().normalize(), df_chat["Start DT"].max().normalize()
+    end = min(start - pd.Timedelta(days=1), last)
+    if end < first:
+        end = last
+    return max(end - pd.Timedelta(weeks=weeks) + pd.Timedelta(days=1), first).date(), end.date()
+
+
+def fit_arrival_profile(df_chat, start, end):
+    """Mean chats offered and AHT per weekday × interval over ``start``..``end``.
+
+    Arrivals are averaged over how often each weekday occurs in the window.
+    An interval with no chats takes the window's overall AHT, so it still has
+    a sensible handle time if a forecast ever puts volume there.
+    """
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    chats = df_chat[(df_chat["Start DT"] >= lo) & (df_chat["Start DT"] < hi)]
+    cells = 7 * INTERVALS_PER_DAY
+    slots = _slots(chats["Start DT"])
+    counts = np.bincount(slots, minlength=cells)
+    seconds = np.bincount(slots, weights=chats["Duration (s)"].to_numpy(dtype=float), minlength=cells)
+
+    weekdays = np.bincount(pd.date_range(lo, hi, inclusive="left").dayofweek, minlength=7)
+    arrivals = counts.reshape(7, -1) / np.maximum(weekdays, 1)[:, None]
+    overall_aht = seconds.sum() / counts.sum() if counts.sum() else 0.0
+    aht = np.divide(seconds, counts, out=np.full(cells, overall_aht), where=counts > 0)
+    return ArrivalProfile(arrivals, aht.reshape(7, -1), pd.Timestamp(start).date(), pd.Timestamp(end).date())
+
+
+def erlang_c_servers(arrivals, aht, service_level, answer_seconds, max_servers=MAX_SERVERS):
+    """Fewest servers answering ``service_level`` of contacts within ``answer_seconds``.
+
+    ``arrivals`` (contacts per interval) and ``aht`` (seconds) are arrays of
+    the same shape. Erlang B is stepped up the server count for every cell
+    together, B(n) = A·B(n-1) / (n + A·B(n-1)), which turns into Erlang C as
+
+        C(n) = n·B / (n - A·(1 - B))
+        service level = 1 - C(n)·exp(-(n - A)·answer_seconds / aht)
+
+    and each cell keeps the first n that reaches the target. Cells with no
+    load need no servers; cells still short at ``max_servers`` are NaN.
+    """
+    load = np.asarray(arrivals, dtype=float) * np.asarray(aht, dtype=float) / INTERVAL_SECONDS
+    aht = np.where(np.asarray(aht, dtype=float) > 0, aht, 1.0)
+    servers = np.where(load > 0, np.nan, 0.0)
+    blocking = np.ones_like(load)
+    for n in range(1, max_servers + 1):
+        pending = np.isnan(servers)
+        if not pending.any():
+            break
+        blocking = load * blocking / (n + load * blocking)
+        stable = pending & (n > load)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            waiting = n * blocking / (n - load * (1 - blocking))
+            met = 1 - waiting * np.exp(-(n - load) * answer_seconds / aht) >= service_level
+        servers[stable & met] = n
+    return servers
+
+
+def scheduled_headcount(rota, start, end):
+    """Agents on shift in each 15-minute interval of ``start``..``end``.
+
+    An agent counts for every interval starting inside their scheduled
+    shift; shifts that began the evening before still count after midnight.
+    """
+    lo, hi = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    intervals = int((hi - lo) / INTERVAL)
+    shifts = rota[(rota["Day Type"] == "scheduled") & rota["Sched Start"].notna() & rota["Sched End"].notna()]
+    shifts = shifts[(shifts["Sched End"] > lo) & (shifts["Sched Start"] < hi)]
+    first = np.ceil((shifts["Sched Start"] - lo) / INTERVAL).to_numpy(dtype=float)
+    last = np.ceil((shifts["Sched End"] - lo) / INTERVAL).to_numpy(dtype=float)
+    delta = np.zeros(intervals + 1, dtype=int)
+    np.add.at(delta, np.clip(first, 0, intervals).astype(int), 1)
+    np.add.at(delta, np.clip(last, 0, intervals).astype(int), -1)
+    return np.cumsum(delta)[:-1]
+
+
+def staffing_plan(profile, rota, start, end, service_level, answer_seconds, concurrency=1.0):
+    """One row per 15-minute interval of ``start``..``end``.
+
+    Columns are the forecast chats and AHT for that weekday and interval,
+    the agents Erlang C requires, the agents the rota schedules, and the
+    gap (scheduled minus required). An agent handling ``concurrency`` chats
+    at once covers that many Erlang C servers.
+    """
+    index = pd.date_range(pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1), freq=INTERVAL, inclusive="left")
+    arrivals, aht = profile.arrivals.ravel(), profile.aht.ravel()
+    required = np.ceil(erlang_c_servers(arrivals, aht, service_level, answer_seconds) / concurrency)
+    slots = _slots(index)
+    plan = pd.DataFrame(
+        {
+            "Forecast Chats": arrivals[slots],
+            "AHT (s)": aht[slots],
+            "Required": required[slots],
+            "Scheduled": scheduled_headcount(rota, start, end),
+        },
+        index=index,
+    )
+    plan["Gap"] = plan["Scheduled"] - plan["Required"]
+    return plan
@@ -0,0 +1,391 @@
+"""Golden-output harness for the metric engines.
+
+Usage:
+    python golden.py compare [--engine dashboard] [--data golden] [--golden golden/metrics.json]
+    python golden.py record  [--engine legacy] [--data golden] [--out golden/metrics.json]
+    python golden.py accept  [--engine dashboard] [--data golden] [--intended golden/intended.json]
+
+``record`` builds a snapshot from the exports in ``--data``, runs an engine
+for every agent over a grid of date ranges and stores each case's metrics
+and timing. ``compare`` runs an engine over the same cases and checks every
+stored metric against the recording within the tolerances below, then
+prints the timings next to the recorded ones. It exits non-zero on any
+mismatch.
+
+``golden/`` holds a small committed fixture (three agents, 22 Jun - 19 Jul
+2026, with an items export and edited rota cells for sick, late, leave,
+24-hour and cross-midnight shifts) and ``golden/metrics.json``, recorded
+from the ``legacy`` engine. So ``python golden.py compare`` checks the
+current engines against the dashboard's original calculations. Its
+timestamps are whole minutes, so the original minute-sampled utilisation is
+exact and tolerances stay tight. Re-record only when a metric's definition
+changes on purpose; metrics the original page never showed (channel
+utilisation, presence durations, percentiles, trends) are only checked
+engine against engine.
+
+Where a definition changed on purpose since the original page, the metric
+is listed in INTENDED with its reason. ``accept`` stores the current
+engine's values for those metrics, next to the recorded ones, in
+``golden/intended.json``; ``compare`` then checks them against the accepted
+values, and fails if the recording no longer holds the value they were
+accepted against. Any other difference is still a mismatch.
+
+An engine is ``name`` from ENGINES or ``module:function``; it is called as
+``engine(snapshot, agent, start, end)`` and returns a flat dict of metric
+name -> number or text. Metrics a candidate engine does not produce are
+listed but do not fail the comparison.
+
+    legacy     the original app.py loops, kept in legacy.py
+    dashboard  what app.py shows: the agent range and history payloads
+    team       what the export API serves: TeamBenchmarks range totals
+"""
+import argparse
+import fnmatch
+import hashlib
+import importlib
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks import BENCHMARK_METRICS, metric_value, percentile_rank
+from cache import DailyResultCache
+from data_store import DATA_FILES, active_agents, load_snapshot
+from legacy import legacy_engine
+from views import build_agent_history_view, build_agent_range_view
+
+DEFAULT_DATA = "golden"
+DEFAULT_GOLDEN = os.path.join(DEFAULT_DATA, "metrics.json")
+DEFAULT_INTENDED = os.path.join(DEFAULT_DATA, "intended.json")
+MAX_LISTED = 20
+MAX_CROSSINGS = 3
+
+# Lookbacks the history payload is recorded with (the sidebar defaults).
+HISTORY_SETTINGS = {"lateness_lookback": 30, "absence_lookback": 90, "trend_lookback": 180, "trend_window": 7}
+
+# (absolute, relative) tolerance by metric-name pattern; the first match
+# wins. None means an exact match. Counts are exact, sums of seconds may be
+# taken in a different order by a faster engine.
+TOLERANCES = [
+    ("per_day.*", None),
+    ("*items", None),
+    ("*days*", None),
+    ("*.count", None),
+    ("absence.*", None),
+    ("lateness.incidents", None),
+    ("*seconds*", (1e-3, 1e-9)),
+    ("team.percentile.*", (1e-6, 0.0)),
+    ("*", (1e-9, 1e-9)),
+]
+
+
+# Metrics whose definition changed on purpose since the original page, with
+# the reason. Where the current engines differ from the recording on one of
+# these, ``accept`` stores both values in intended.json and ``compare``
+# checks the metric against the accepted value instead.
+INTENDED = [
+    ("totals.available_seconds",
+     "presence running past midnight is split at midnight; the original counted the whole segment on its start day"),
+    ("metric.shift_utilisation",
+     "utilisation is the exact overlap of items with presence split at midnight; the original sampled minutes "
+     "and cut the range at 23:59"),
+]
+
+
+def intended_reason(metric):
+    return next((reason for pattern, reason in INTENDED if fnmatch.fnmatchcase(metric, pattern)), None)
+
+
+def tolerance(metric):
+    return next(tol for pattern, tol in TOLERANCES if fnmatch.fnmatchcase(metric, pattern))
+
+
+def matches(metric, expected, actual):
+    if isinstance(expected, str) or isinstance(actual, str) or tolerance(metric) is None:
+        if isinstance(expected, float) and isinstance(actual, float) and math.isnan(expected):
+            return math.isnan(actual)
+        return expected == actual
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    if math.isnan(expected) or math.isnan(actual):
+        return math.isnan(expected) and math.isnan(actual)
+    absolute, relative = tolerance(metric)
+    return abs(actual - expected) <= absolute + relative * abs(expected)
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+# -----------------------------
+# Engines
+# -----------------------------
+def dashboard_engine(snapshot, agent, start, end):
+    """The agent page: range payload (with a cold daily cache) plus the history payload."""
+    view = build_agent_range_view(snapshot, DailyResultCache(), agent, start, end)
+    history = build_agent_history_view(snapshot, agent, end, *HISTORY_SETTINGS.values())
+
+    totals = view.range_totals
+    result = {f"totals.{field}": _number(value) for field, value in totals.items()}
+    for metric in BENCHMARK_METRICS:
+        if BENCHMARK_METRICS[metric][0] in totals:
+            value = metric_value(totals, metric)
+            result[f"metric.{metric}"] = _number(value)
+            if value is not None and metric in view.range_benchmarks:
+                result[f"team.percentile.{metric}"] = percentile_rank(view.range_benchmarks[metric], value)
+    result["flags.has_presence"] = str(view.has_presence)
+    result["flags.has_scheduled_shift"] = str(view.has_scheduled_shift)
+    result["flags.has_sick_event"] = str(view.has_sick_event)
+    if view.long_chats is not None:
+        result["long_chats.count"] = len(view.long_chats)
+        result["long_chats.seconds"] = float(view.long_chats["Duration (s)"].sum())
+    for row in view.per_day.to_dict("records"):
+        for column, value in row.items():
+            if column != "Date":
+                result[f"per_day.{row['Date']}.{column}"] = str(value)
+
+    if history.late_df is not None:
+        result["lateness.total_minutes"] = float(history.total_minutes_late)
+        result["lateness.incidents"] = len(history.late_df)
+        result["absence.absent"] = len(history.absent_dates)
+        result["absence.sick"] = len(history.sick_dates)
+    for chart, frame in history.trend_charts.items():
+        for series, values in frame.items():
+            result[f"trend.{chart}.{series}.last"] = _number(values.iloc[-1]) if len(values) else None
+    return result
+
+
+def team_engine(snapshot, agent, start, end):
+    """The export API: range totals from the team table's prefix sums."""
+    totals = snapshot.team.range_totals(start, end).loc[agent]
+    result = {f"totals.{field}": _number(value) for field, value in totals.items()}
+    result.update({f"metric.{metric}": _number(metric_value(totals, metric)) for metric in BENCHMARK_METRICS})
+    result["long_chats.count"] = int(totals["long_chats"])
+    return result
+
+
+ENGINES = {"legacy": legacy_engine, "dashboard": dashboard_engine, "team": team_engine}
+
+
+def resolve_engine(name):
+    if name in ENGINES:
+        return ENGINES[name]
+    module, _, function = name.partition(":")
+    return getattr(importlib.import_module(module), function)
+
+
+# -----------------------------
+# Cases
+# -----------------------------
+def range_grid(snapshot):
+    """(label, start, end) date ranges ending on the latest presence day.
+
+    Ranges that end on, or start just after, a day whose presence runs past
+    midnight are added for the first MAX_CROSSINGS such days, so the split
+    at midnight is cut through rather than always taken whole.
+    """
+    days = snapshot.presence_days["Day"]
+    first, last = days.min().date(), days.max().date()
+    month_end = last.replace(day=1) - timedelta(days=1)
+    grid = [
+        ("last day", last, last),
+        ("last 7 days", last - timedelta(days=6), last),
+        ("last 28 days", last - timedelta(days=27), last),
+        ("previous month", month_end.replace(day=1), month_end),
+        ("all data", first, last),
+    ]
+    tails = sorted({day.date() for day in days[snapshot.presence_days["Continued"]]})[:MAX_CROSSINGS]
+    for tail in tails:
+        crossing = tail - timedelta(days=1)
+        grid += [
+            ("crossing day", crossing, crossing),
+            ("7 days to crossing", crossing - timedelta(days=6), crossing),
+            ("day after crossing", tail, tail),
+        ]
+    seen, cases = set(), []
+    for label, start, end in grid:
+        start = max(start, first)
+        if end >= first and (start, end) not in seen:
+            seen.add((start, end))
+            cases.append((label, start, end))
+    return cases
+
+
+def run_cases(snapshot, engine):
+    """{case id: {"metrics": ..., "ms": ...}} for every agent and range."""
+    cases = {}
+    for agent in active_agents(snapshot.df_presence):
+        for label, start, end in range_grid(snapshot):
+            started = time.perf_counter()
+            metrics = engine(snapshot, agent, start, end)
+            elapsed = (time.perf_counter() - started) * 1000
+            cases[f"{agent} | {label} | {start}..{end}"] = {"metrics": metrics, "ms": round(elapsed, 3)}
+    return cases
+
+
+def data_digest():
+    """Content hash of the exports, unlike the snapshot version which follows mtimes."""
+    digest = hashlib.sha1()
+    for path in DATA_FILES:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(path.encode() + b"\0" + f.read())
+    return digest.hexdigest()[:12]
+
+
+def timed_snapshot():
+    started = time.perf_counter()
+    snapshot = load_snapshot()
+    return snapshot, (time.perf_counter() - started) * 1000
+
+
+# -----------------------------
+# Commands
+# -----------------------------
+def record(args):
+    snapshot, snapshot_ms = timed_snapshot()
+    cases = run_cases(snapshot, resolve_engine(args.engine))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(
+            {"engine": args.engine, "data": data_digest(), "snapshot_ms": round(snapshot_ms, 1), "cases": cases},
+            f,
+            indent=1,
+        )
+    metrics = sum(len(case["metrics"]) for case in cases.values())
+    print(f"recorded {len(cases)} cases, {metrics} metrics from engine '{args.engine}' to {args.out}")
+    return 0
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def diff_cases(golden, cases, intended):
+    """Check ``cases`` against the recording, reading accepted values from ``intended``.
+
+    Returns (mismatches, stale, verified, missing sections, compared count):
+    stale accepted values no longer match the recording they were accepted
+    against, verified ones are the intended divergences that still hold.
+    """
+    mismatches, stale, verified, missing, compared = [], [], [], set(), 0
+    for case_id, expected in golden["cases"].items():
+        actual = cases.get(case_id)
+        if actual is None:
+            mismatches.append((case_id, "<case>", "present", "missing"))
+            continue
+        accepted = intended.get(case_id, {})
+        for metric, value in expected["metrics"].items():
+            if metric not in actual["metrics"]:
+                missing.add(metric.split(".")[0])
+                continue
+            compared += 1
+            now = actual["metrics"][metric]
+            if metric in accepted:
+                if not matches(metric, accepted[metric]["golden"], value):
+                    stale.append((case_id, metric, accepted[metric]["golden"], value))
+                    continue
+                if matches(metric, accepted[metric]["expected"], now):
+                    verified.append(metric)
+                    continue
+                value = accepted[metric]["expected"]
+            if not matches(metric, value, now):
+                mismatches.append((case_id, metric, value, now))
+    return mismatches, stale, verified, missing, compared
+
+
+def compare(args):
+    golden = load_json(args.golden)
+    intended = load_json(args.intended)["cases"] if os.path.exists(args.intended) else {}
+    snapshot, snapshot_ms = timed_snapshot()
+    if data_digest() != golden["data"]:
+        print(f"warning: the exports in {os.getcwd()} differ from the ones recorded")
+    cases = run_cases(snapshot, resolve_engine(args.engine))
+    mismatches, stale, verified, missing, compared = diff_cases(golden, cases, intended)
+
+    print(f"engine '{args.engine}' vs recording of '{golden['engine']}': {compared} metrics in {len(cases)} cases")
+    if missing:
+        print(f"not produced by this engine: {', '.join(sorted(missing))}")
+    if verified:
+        print(f"intended changes, checked against {os.path.basename(args.intended)}:")
+        for pattern, reason in INTENDED:
+            count = sum(fnmatch.fnmatchcase(metric, pattern) for metric in verified)
+            if count:
+                print(f"  {pattern} ({count}): {reason}")
+    for case_id, metric, accepted, recorded in stale[:MAX_LISTED]:
+        print(f"  STALE {case_id} :: {metric}: accepted against {accepted!r}, recording has {recorded!r}")
+    for case_id, metric, expected, actual in mismatches[:MAX_LISTED]:
+        print(f"  MISMATCH {case_id} :: {metric}: expected {expected!r}, now {actual!r}")
+    if len(mismatches) > MAX_LISTED:
+        print(f"  … and {len(mismatches) - MAX_LISTED} more")
+
+    shared = [case_id for case_id in golden["cases"] if case_id in cases]
+    rows = [
+        ("snapshot build", golden["snapshot_ms"], snapshot_ms),
+        ("per case, median", statistics.median(golden["cases"][c]["ms"] for c in shared),
+         statistics.median(cases[c]["ms"] for c in shared)),
+        ("all cases", sum(golden["cases"][c]["ms"] for c in shared), sum(cases[c]["ms"] for c in shared)),
+    ] if shared else []
+    print(f"\n{'timing':<20}{'golden ms':>12}{'now ms':>12}{'speedup':>10}")
+    for label, before, after in rows:
+        print(f"{label:<20}{before:>12.1f}{after:>12.1f}{before / after if after else float('inf'):>9.2f}x")
+
+    if stale:
+        print(f"\nFAIL: {len(stale)} accepted values are stale; re-run accept")
+        return 1
+    print("\nOK: all metrics match" if not mismatches else f"\nFAIL: {len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+
+def accept(args):
+    """Store the engine's values where it differs from the recording on an INTENDED metric."""
+    golden = load_json(args.golden)
+    snapshot, _ = timed_snapshot()
+    cases = run_cases(snapshot, resolve_engine(args.engine))
+    accepted, rejected = {}, []
+    for case_id, metric, value, now in diff_cases(golden, cases, {})[0]:
+        if intended_reason(metric) is None:
+            rejected.append((case_id, metric, value, now))
+        else:
+            accepted.setdefault(case_id, {})[metric] = {"golden": value, "expected": now}
+    with open(args.intended, "w", encoding="utf-8") as f:
+        json.dump({"engine": args.engine, "data": data_digest(), "cases": accepted}, f, indent=1)
+    count = sum(len(metrics) for metrics in accepted.values())
+    print(f"accepted {count} intended changes from engine '{args.engine}' to {args.intended}")
+    for case_id, metric, expected, actual in rejected[:MAX_LISTED]:
+        print(f"  NOT INTENDED {case_id} :: {metric}: golden {expected!r}, now {actual!r}")
+    if len(rejected) > MAX_LISTED:
+        print(f"  … and {len(rejected) - MAX_LISTED} more")
+    return 1 if rejected else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="store an engine's metrics as the golden output")
+    record_parser.add_argument("--out", default=DEFAULT_GOLDEN)
+    record_parser.add_argument("--engine", default="legacy")
+    record_parser.add_argument("--data", default=DEFAULT_DATA, help="directory holding the exports")
+    for command, summary in (
+        ("compare", "check an engine against the golden output"),
+        ("accept", "store an engine's values for the intended changes"),
+    ):
+        command_parser = commands.add_parser(command, help=summary)
+        command_parser.add_argument("--golden", default=DEFAULT_GOLDEN)
+        command_parser.add_argument("--intended", default=DEFAULT_INTENDED)
+        command_parser.add_argument("--engine", default="dashboard")
+        command_parser.add_argument("--data", default=DEFAULT_DATA, help="directory holding the exports")
+    args = parser.parse_args()
+    # The loaders, and the legacy engine, read the exports from the working directory.
+    for name in ("out", "golden", "intended"):
+        if hasattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    os.chdir(args.data)
+    return {"record": record, "compare": compare, "accept": accept}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,528 @@
+"""The dashboard's original calculations, kept as the golden reference.
+
+These are the per-range loops app.py ran before the metric engines were
+rewritten: exports parsed on every load, the rota read cell by cell with
+``parse_shift_range``, utilisation sampled minute by minute, and lateness
+and absence scanned a day at a time. Only the Streamlit calls are gone; the
+arithmetic is unchanged so ``golden.py`` can check newer engines against
+it. Do not optimise this module.
+"""
+import re
+from datetime import datetime, timedelta, time as dtime
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+from data_store import LEFT_COMPANY
+
+LONG_CHAT_THRESHOLD_SECONDS = 15 * 60
+
+# data version -> frames as the original load_data parsed them
+_loaded = {}
+
+
+def safe_read_csv(path, **kwargs):
+    """Read a CSV and gracefully handle empty or missing files."""
+    try:
+        return pd.read_csv(path, **kwargs)
+    except (EmptyDataError, FileNotFoundError):
+        return pd.DataFrame()
+
+
+def load_data():
+    # Items
+    df_items = safe_read_csv("report_items.csv", dayfirst=True)
+    if not df_items.empty:
+        df_items["Start DT"] = pd.to_datetime(df_items["Start DT"], dayfirst=True, errors="coerce")
+        df_items["End DT"] = pd.to_datetime(df_items["End DT"], dayfirst=True, errors="coerce")
+        df_items["User: Full Name"] = df_items["User: Full Name"].astype(str).str.strip()
+        df_items["Service Channel: Developer Name"] = df_items["Service Channel: Developer Name"].astype(str).str.strip()
+
+    # Presence
+    df_presence = safe_read_csv("report_presence.csv", dayfirst=True)
+    if not df_presence.empty:
+        df_presence["Start DT"] = pd.to_datetime(df_presence["Start DT"], dayfirst=True, errors="coerce")
+        df_presence["End DT"] = pd.to_datetime(df_presence["End DT"], dayfirst=True, errors="coerce")
+        df_presence["Created By: Full Name"] = df_presence["Created By: Full Name"].astype(str).str.strip()
+        df_presence["Service Presence Status: Developer Name"] = df_presence["Service Presence Status: Developer Name"].astype(str).str.strip()
+
+    # Shifts
+    df_shifts = safe_read_csv("shifts.csv")
+    if not df_shifts.empty:
+        if "Column1" in df_shifts.columns and "Agent Name" not in df_shifts.columns:
+            df_shifts.rename(columns={"Column1": "Agent Name"}, inplace=True)
+        if "Agent Name" in df_shifts.columns:
+            df_shifts["Agent Name"] = df_shifts["Agent Name"].astype(str).str.strip()
+
+    # Chat transcripts — one row per conversation, with exact start/end times
+    df_chat = safe_read_csv("chat_transcripts.csv")
+    if df_chat.empty:
+        # Try common alternative filenames in case it was uploaded differently
+        for alt in ["chat_transcript.csv", "chat.csv", "transcripts.csv", "report1771339850121.csv"]:
+            df_chat = safe_read_csv(alt)
+            if not df_chat.empty:
+                break
+    if not df_chat.empty:
+        clean = {col: col.encode("utf-8").decode("utf-8-sig").strip() for col in df_chat.columns}
+        df_chat.rename(columns=clean, inplace=True)
+
+        agent_col = next((c for c in df_chat.columns if "Full Name" in c), None)
+        if agent_col and agent_col != "Agent Name":
+            df_chat.rename(columns={agent_col: "Agent Name"}, inplace=True)
+
+        case_col = next((c for c in df_chat.columns if "Case Number" in c), None)
+        if case_col and case_col != "Case Number":
+            df_chat.rename(columns={case_col: "Case Number"}, inplace=True)
+
+        if "Agent Name" in df_chat.columns:
+            df_chat["Agent Name"] = df_chat["Agent Name"].astype(str).str.strip()
+        if "Start Time" in df_chat.columns:
+            df_chat["Start DT"] = pd.to_datetime(df_chat["Start Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
+        if "End Time" in df_chat.columns:
+            df_chat["End DT"] = pd.to_datetime(df_chat["End Time"], format="%d/%m/%Y, %H:%M", errors="coerce")
+        if "Start DT" in df_chat.columns and "End DT" in df_chat.columns:
+            df_chat["Duration (s)"] = (df_chat["End DT"] - df_chat["Start DT"]).dt.total_seconds()
+            # Drop abandoned chats (zero/null duration — visitor left before agent responded)
+            df_chat = df_chat[
+                df_chat["Start DT"].notna() &
+                df_chat["End DT"].notna() &
+                (df_chat["Duration (s)"] > 0)
+            ].copy()
+
+    return df_items, df_presence, df_shifts, df_chat
+
+
+# -----------------------------
+# Rota parsing
+# -----------------------------
+def normalise_shift_value(value):
+    """Return a clean shift/event string from the rota cell."""
+    if pd.isna(value):
+        return ""
+    return " ".join(str(value).replace("\n", " ").strip().split())
+
+
+def get_shift_value(df_shifts, agent_shift_row, shift_col):
+    if agent_shift_row.empty or shift_col not in df_shifts.columns:
+        return ""
+    return normalise_shift_value(agent_shift_row[shift_col].values[0])
+
+
+def is_not_assigned_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return text in {"", "nan", "not assigned", "n/a", "na", "day off", "off"}
+
+
+def is_sick_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return any(word in text for word in ["sick", "sickness", "illness", "ill"])
+
+
+def is_manual_late_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return "late" in text
+
+
+def parse_shift_range(shift_str, base_date):
+    """Parse rota shifts like '7:00 AM - 4:00 PM', even if notes/newlines are present."""
+    text = normalise_shift_value(shift_str)
+    if not text:
+        return None, None
+
+    # Accept both hyphen and en dash separators, and ignore notes such as Sick/Late after the times.
+    matches = re.findall(r"\b(\d{1,2}:\d{2}\s*(?:AM|PM)?)\b", text, flags=re.IGNORECASE)
+    if len(matches) < 2:
+        return None, None
+
+    parsed_times = []
+    for part in matches[:2]:
+        part = part.strip().upper().replace(" ", "")
+        for fmt in ("%I:%M%p", "%H:%M"):
+            try:
+                parsed_times.append(datetime.strptime(part, fmt).time())
+                break
+            except ValueError:
+                continue
+
+    if len(parsed_times) < 2:
+        return None, None
+
+    start_dt = datetime.combine(base_date, parsed_times[0])
+    end_dt = datetime.combine(base_date, parsed_times[1])
+    if end_dt <= start_dt:
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+
+def has_shift_time(shift_str, base_date):
+    sched_start, sched_end = parse_shift_range(shift_str, base_date)
+    return sched_start is not None and sched_end is not None
+
+
+def classify_rota_day(shift_str, base_date):
+    shift_str = normalise_shift_value(shift_str)
+    if is_not_assigned_shift(shift_str):
+        return "not_assigned"
+    if is_sick_shift(shift_str):
+        return "sick"
+    if has_shift_time(shift_str, base_date):
+        return "scheduled"
+    if is_manual_late_shift(shift_str):
+        return "manual_late"
+    return "other_event"
+
+
+# -----------------------------
+# Agent page
+# -----------------------------
+def agent_page(frames, agent, start_date, end_date):
+    """Every number the original agent page showed for ``agent`` over ``start_date``..``end_date``."""
+    df_items, df_presence, df_shifts, df_chat = frames
+    out = {}
+
+    range_start_dt = datetime.combine(start_date, dtime(0, 0))
+    range_end_dt = datetime.combine(end_date, dtime(23, 59))
+
+    df_presence_agent_range = df_presence[
+        (df_presence["Created By: Full Name"] == agent)
+        & (df_presence["End DT"] >= range_start_dt)
+        & (df_presence["Start DT"] <= range_end_dt)
+    ].copy()
+
+    df_items_agent = df_items[
+        (df_items["User: Full Name"] == agent)
+        & (~df_items["Start DT"].isna())
+        & (~df_items["End DT"].isna())
+    ].copy()
+    df_items_agent["Start Date"] = df_items_agent["Start DT"].dt.date
+
+    df_items_agent_range = df_items_agent[
+        (df_items_agent["Start Date"] >= start_date)
+        & (df_items_agent["Start Date"] <= end_date)
+    ].copy()
+
+    day_list = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
+    has_scheduled_shift = False
+    has_sick_event = False
+    for d in day_list:
+        shift_col = d.strftime("%d/%m/%Y")
+        sched_shift = get_shift_value(df_shifts, agent_shift_row, shift_col)
+        day_type = classify_rota_day(sched_shift, d)
+        if day_type == "scheduled":
+            has_scheduled_shift = True
+        elif day_type == "sick":
+            has_sick_event = True
+
+        if has_scheduled_shift and has_sick_event:
+            break
+
+    out["has_presence"] = not df_presence_agent_range.empty
+    out["has_scheduled_shift"] = has_scheduled_shift
+    out["has_sick_event"] = has_sick_event
+
+    # AHT & Volume
+    df_range_items = df_items_agent_range.copy()
+    df_range_items["Duration"] = (df_range_items["End DT"] - df_range_items["Start DT"]).dt.total_seconds()
+
+    chat_items = df_range_items[df_range_items["Service Channel: Developer Name"] == "sfdc_liveagent"]
+    email_items = df_range_items[df_range_items["Service Channel: Developer Name"] == "casesChannel"]
+
+    out["aht_chat"] = chat_items["Duration"].mean() if not chat_items.empty else None
+    out["aht_email"] = email_items["Duration"].mean() if not email_items.empty else None
+    out["num_chat_items"] = len(chat_items)
+    out["num_email_items"] = len(email_items)
+
+    # Shift utilisation, sampled once a minute
+    minutes = pd.date_range(start=range_start_dt, end=range_end_dt, freq="min", inclusive="left")
+
+    total_available_minutes = 0
+    total_handling_minutes = 0
+
+    for t in minutes:
+        pres_at_t = df_presence_agent_range[
+            (df_presence_agent_range["Start DT"] <= t)
+            & (df_presence_agent_range["End DT"] > t)
+        ]
+        status = pres_at_t.iloc[0]["Service Presence Status: Developer Name"] if not pres_at_t.empty else None
+
+        if status in ("Available_Chat", "Available_Email_and_Web", "Available_All"):
+            total_available_minutes += 1
+
+            is_handling = not df_items_agent_range[
+                (df_items_agent_range["Service Channel: Developer Name"].isin(["sfdc_liveagent", "casesChannel"]))
+                & (df_items_agent_range["Start DT"] <= t)
+                & (df_items_agent_range["End DT"] > t)
+            ].empty
+
+            if is_handling:
+                total_handling_minutes += 1
+
+    out["total_available_minutes"] = total_available_minutes
+    out["total_handling_minutes"] = total_handling_minutes
+    out["shift_utilization"] = total_handling_minutes / total_available_minutes if total_available_minutes > 0 else 0.0
+
+    # Long chat handles
+    out["long_chats"] = None
+    required_chat_cols = {"Agent Name", "Start DT", "End DT", "Duration (s)"}
+    if not df_chat.empty and required_chat_cols.issubset(df_chat.columns):
+        agent_chats = df_chat[
+            (df_chat["Agent Name"] == agent) &
+            (df_chat["Start DT"].dt.date >= start_date) &
+            (df_chat["Start DT"].dt.date <= end_date)
+        ].copy()
+        out["long_chats"] = agent_chats[
+            agent_chats["Duration (s)"] >= LONG_CHAT_THRESHOLD_SECONDS
+        ].sort_values("Start DT").reset_index(drop=True)
+
+    # Daily overview
+    total_shift_seconds = 0
+    total_available_seconds = 0
+    days_worked = 0
+
+    lunch_days_with_data = 0
+    lunch_days_out_of_window = 0
+
+    available_statuses = {"Available_Chat", "Available_Email_and_Web", "Available_All"}
+
+    for d in day_list:
+        agent_daily = df_presence_agent_range[df_presence_agent_range["Start DT"].dt.date == d].copy()
+        if agent_daily.empty:
+            continue
+
+        days_worked += 1
+
+        first_segment_start = agent_daily["Start DT"].min()
+        last_segment_end = agent_daily["End DT"].max()
+        day_shift_duration = (last_segment_end - first_segment_start).total_seconds()
+        total_shift_seconds += day_shift_duration
+
+        shift_col = d.strftime("%d/%m/%Y")
+        scheduled_shift = get_shift_value(df_shifts, agent_shift_row, shift_col)
+        scheduled_shift_start, _ = parse_shift_range(scheduled_shift, d)
+
+        avail_df_day = agent_daily[agent_daily["Service Presence Status: Developer Name"].isin(available_statuses)]
+        if not avail_df_day.empty:
+            day_available_seconds = (avail_df_day["End DT"] - avail_df_day["Start DT"]).dt.total_seconds().sum()
+            total_available_seconds += day_available_seconds
+
+        lunch_entry = agent_daily[
+            agent_daily["Service Presence Status: Developer Name"] == "Busy_Lunch"
+        ].sort_values(by="Start DT")
+        if not lunch_entry.empty and scheduled_shift_start is not None:
+            lunch_days_with_data += 1
+            lunch_start = lunch_entry.iloc[0]["Start DT"]
+            time_to_lunch = (lunch_start - scheduled_shift_start).total_seconds()
+            # Allow a 15-minute grace period either side of the 3–5 hour lunch window.
+            if time_to_lunch < (2 * 3600 + 45 * 60) or time_to_lunch > (5 * 3600 + 15 * 60):
+                lunch_days_out_of_window += 1
+
+    out["total_shift_seconds"] = total_shift_seconds
+    out["total_available_seconds"] = total_available_seconds
+    out["days_worked"] = days_worked
+    out["lunch_days_with_data"] = lunch_days_with_data
+    out["lunch_days_out_of_window"] = lunch_days_out_of_window
+
+    # Per-day shift & adherence
+    per_day_rows = []
+    for d in day_list:
+        shift_col = d.strftime("%d/%m/%Y")
+        sched_shift = get_shift_value(df_shifts, agent_shift_row, shift_col)
+        day_type = classify_rota_day(sched_shift, d)
+
+        agent_daily = df_presence_agent_range[df_presence_agent_range["Start DT"].dt.date == d].copy()
+
+        if agent_daily.empty:
+            if day_type == "sick":
+                status = "Sick"
+            elif day_type == "scheduled":
+                status = "Absent (Scheduled)"
+            elif day_type == "manual_late":
+                status = "Late (Recorded)"
+            elif day_type == "other_event":
+                status = sched_shift
+            else:
+                status = "Day Off / Not Assigned"
+            per_day_rows.append(
+                {
+                    "Date": d.strftime("%d %b %Y"),
+                    "Scheduled Shift": sched_shift or "Not Assigned",
+                    "Actual Shift": "—",
+                    "Lunch Break": "—",
+                    "Late (min)": "",
+                    "Status": status,
+                }
+            )
+            continue
+
+        earliest = agent_daily["Start DT"].min()
+        latest = agent_daily["End DT"].max()
+        actual_shift_str = f"{earliest.strftime('%H:%M')}–{latest.strftime('%H:%M')}"
+
+        lunch_segments = agent_daily[
+            agent_daily["Service Presence Status: Developer Name"] == "Busy_Lunch"
+        ].sort_values("Start DT")
+
+        if not lunch_segments.empty:
+            lunch_start = lunch_segments["Start DT"].min()
+            lunch_end = lunch_segments["End DT"].max()
+            lunch_seconds = (
+                lunch_segments["End DT"] - lunch_segments["Start DT"]
+            ).dt.total_seconds().clip(lower=0).sum()
+            lunch_minutes = int(round(lunch_seconds / 60))
+            lunch_break_str = (
+                f"{lunch_start.strftime('%H:%M')}–{lunch_end.strftime('%H:%M')} "
+                f"({lunch_minutes} min)"
+            )
+        else:
+            lunch_break_str = "—"
+
+        late_minutes = ""
+        status = "Worked"
+
+        if day_type == "sick":
+            status = "Sick (worked)"
+        elif day_type == "manual_late":
+            status = "Late (Recorded)"
+        elif day_type == "scheduled":
+            sched_start, _ = parse_shift_range(sched_shift, d)
+            if sched_start:
+                delay = (earliest - sched_start).total_seconds() / 60
+                if delay >= 5:
+                    late_minutes = int(delay)
+                    status = "Late"
+                else:
+                    status = "On Time"
+
+        per_day_rows.append(
+            {
+                "Date": d.strftime("%d %b %Y"),
+                "Scheduled Shift": sched_shift or "Not Assigned",
+                "Actual Shift": actual_shift_str,
+                "Lunch Break": lunch_break_str,
+                "Late (min)": late_minutes,
+                "Status": status,
+            }
+        )
+    out["per_day"] = per_day_rows
+    return out
+
+
+def lateness(frames, agent, anchor_date, days=30):
+    """Total minutes late and the incident lines over the ``days`` ending on ``anchor_date``."""
+    _, df_presence, df_shifts, _ = frames
+    total_minutes_late = 0
+    window_days = [anchor_date - timedelta(days=i) for i in range(0, days)]
+    lateness_incidents = []
+
+    agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
+
+    for d in window_days:
+        shift_col = d.strftime("%d/%m/%Y")
+        sched_shift_d = get_shift_value(df_shifts, agent_shift_row, shift_col)
+        day_type_d = classify_rota_day(sched_shift_d, d)
+
+        df_day_late_check = df_presence[
+            (df_presence["Created By: Full Name"] == agent)
+            & (df_presence["Start DT"].dt.date == d)
+        ]
+
+        if day_type_d == "manual_late":
+            lateness_incidents.append(
+                f"- **{d.strftime('%d %b %Y')}**: Recorded late"
+            )
+            continue
+
+        if not df_day_late_check.empty and day_type_d == "scheduled":
+            sched_start_d, _ = parse_shift_range(sched_shift_d, d)
+            actual_start_time_d = df_day_late_check["Start DT"].min()
+            if sched_start_d and actual_start_time_d:
+                delay = (actual_start_time_d - sched_start_d).total_seconds() / 60
+                if delay >= 5:
+                    total_minutes_late += delay
+                    lateness_incidents.append(
+                        f"- **{d.strftime('%d %b %Y')}**: {int(delay)} min late"
+                    )
+    return total_minutes_late, lateness_incidents
+
+
+def absence(frames, agent, anchor_date, days=90):
+    """Absent and sick day labels over the ``days`` ending on ``anchor_date``."""
+    _, df_presence, df_shifts, _ = frames
+    abs_window = [anchor_date - timedelta(days=i) for i in range(0, days)]
+    absent_days = []
+    sick_days = []
+
+    agent_shift_row = df_shifts[df_shifts["Agent Name"].str.lower() == agent.lower()] if "Agent Name" in df_shifts.columns else pd.DataFrame()
+
+    for d in abs_window:
+        shift_col_d = d.strftime("%d/%m/%Y")
+        sched_shift_d = get_shift_value(df_shifts, agent_shift_row, shift_col_d)
+        day_type_d = classify_rota_day(sched_shift_d, d)
+
+        if day_type_d == "sick":
+            sick_days.append(d.strftime("%d %b %Y"))
+            continue
+
+        if day_type_d != "scheduled":
+            continue
+
+        df_day_presence = df_presence[
+            (df_presence["Created By: Full Name"] == agent)
+            & (df_presence["Start DT"].dt.date == d)
+        ]
+
+        if df_day_presence.empty:
+            absent_days.append(d.strftime("%d %b %Y"))
+    return absent_days, sick_days
+
+
+# -----------------------------
+# Golden engine
+# -----------------------------
+def legacy_engine(snapshot, agent, start, end):
+    """``golden.py`` engine: the original page's numbers under the shared metric names.
+
+    The exports are re-parsed the original way once per data version. Ratios
+    with nothing to divide by are reported as None, as the metric engines do.
+    """
+    if snapshot.version not in _loaded:
+        _loaded.clear()
+        _loaded[snapshot.version] = load_data()
+    frames = _loaded[snapshot.version]
+    if agent in LEFT_COMPANY:
+        return {}
+
+    page = agent_page(frames, agent, start, end)
+    result = {
+        "flags.has_presence": str(page["has_presence"]),
+        "flags.has_scheduled_shift": str(page["has_scheduled_shift"]),
+        "flags.has_sick_event": str(page["has_sick_event"]),
+        "totals.chat_items": float(page["num_chat_items"]),
+        "totals.email_items": float(page["num_email_items"]),
+        "metric.aht_chat": page["aht_chat"],
+        "metric.aht_email": page["aht_email"],
+        "metric.shift_utilisation": page["shift_utilization"] if page["total_available_minutes"] else None,
+        "totals.shift_seconds": float(page["total_shift_seconds"]),
+        "totals.available_seconds": float(page["total_available_seconds"]),
+        "totals.days_worked": float(page["days_worked"]),
+        "totals.lunch_days_with_data": float(page["lunch_days_with_data"]),
+        "totals.lunch_days_out_of_window": float(page["lunch_days_out_of_window"]),
+    }
+    if page["long_chats"] is not None:
+        result["long_chats.count"] = len(page["long_chats"])
+        result["long_chats.seconds"] = float(page["long_chats"]["Duration (s)"].sum())
+    for row in page["per_day"]:
+        for column, value in row.items():
+            if column != "Date":
+                result[f"per_day.{row['Date']}.{column}"] = str(value)
+
+    if not frames[2].empty:
+        total_minutes_late, incidents = lateness(frames, agent, end)
+        absent_days, sick_days = absence(frames, agent, end)
+        result["lateness.total_minutes"] = float(total_minutes_late)
+        result["lateness.incidents"] = len(incidents)
+        result["absence.absent"] = len(absent_days)
+        result["absence.sick"] = len(sick_days)
+    return result
@@ -0,0 +1,504 @@
+"""Metric engines for the agent dashboard.
+
+Everything in here works on the frames returned by ``load_data()`` and has no
+Streamlit dependency, so results can be cached by the app and computed
+headlessly.
+"""
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+# -----------------------------
+# Rota parsing
+# -----------------------------
+ROTA_DATE_FORMAT = "%d/%m/%Y"
+
+
+def normalise_shift_value(value):
+    """Return a clean shift/event string from the rota cell."""
+    if pd.isna(value):
+        return ""
+    return " ".join(str(value).replace("\n", " ").strip().split())
+
+
+def is_not_assigned_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return text in {"", "nan", "not assigned", "n/a", "na", "day off", "off"}
+
+
+def is_sick_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return any(word in text for word in ["sick", "sickness", "illness", "ill"])
+
+
+def is_manual_late_shift(shift_str):
+    text = normalise_shift_value(shift_str).lower()
+    return "late" in text
+
+
+def parse_shift_range(shift_str, base_date):
+    """Parse rota shifts like '7:00 AM - 4:00 PM', even if notes/newlines are present."""
+    text = normalise_shift_value(shift_str)
+    if not text:
+        return None, None
+
+    # Accept both hyphen and en dash separators, and ignore notes such as Sick/Late after the times.
+    matches = re.findall(r"\b(\d{1,2}:\d{2}\s*(?:AM|PM)?)\b", text, flags=re.IGNORECASE)
+    if len(matches) < 2:
+        return None, None
+
+    parsed_times = []
+    for part in matches[:2]:
+        part = part.strip().upper().replace(" ", "")
+        for fmt in ("%I:%M%p", "%H:%M"):
+            try:
+                parsed_times.append(datetime.strptime(part, fmt).time())
+                break
+            except ValueError:
+                continue
+
+    if len(parsed_times) < 2:
+        return None, None
+
+    start_dt = datetime.combine(base_date, parsed_times[0])
+    end_dt = datetime.combine(base_date, parsed_times[1])
+    if end_dt <= start_dt:
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+
+def has_shift_time(shift_str, base_date):
+    sched_start, sched_end = parse_shift_range(shift_str, base_date)
+    return sched_start is not None and sched_end is not None
+
+
+def classify_rota_day(shift_str, base_date):
+    shift_str = normalise_shift_value(shift_str)
+    if is_not_assigned_shift(shift_str):
+        return "not_assigned"
+    if is_sick_shift(shift_str):
+        return "sick"
+    if has_shift_time(shift_str, base_date):
+        return "scheduled"
+    if is_manual_late_shift(shift_str):
+        return "manual_late"
+    return "other_event"
+
+
+# -----------------------------
+# Rota model
+# -----------------------------
+ROTA_COLUMNS = ["Agent Key", "Date", "Shift", "Day Type", "Sched Start", "Sched End"]
+
+
+def _empty_rota():
+    datetime_cols = {"Date", "Sched Start", "Sched End"}
+    return pd.DataFrame(
+        {col: pd.Series(dtype="datetime64[ns]" if col in datetime_cols else object) for col in ROTA_COLUMNS}
+    )
+
+
+def _shift_lookup(shift_values):
+    """Classify and parse each distinct rota string once.
+
+    Shift times only depend on the time of day, so they are stored as offsets
+    from midnight and added to each rota date afterwards.
+    """
+    epoch = datetime(2000, 1, 1)
+    rows = []
+    for value in shift_values:
+        shift = normalise_shift_value(value)
+        start_dt, end_dt = parse_shift_range(shift, epoch.date())
+        rows.append(
+            {
+                "Shift": shift,
+                "Day Type": classify_rota_day(shift, epoch.date()),
+                "Start Offset": pd.Timedelta(start_dt - epoch) if start_dt else pd.NaT,
+                "End Offset": pd.Timedelta(end_dt - epoch) if end_dt else pd.NaT,
+            }
+        )
+    lookup = pd.DataFrame(rows, columns=["Shift", "Day Type", "Start Offset", "End Offset"])
+    for col in ("Start Offset", "End Offset"):
+        lookup[col] = pd.to_timedelta(lookup[col])
+    return lookup
+
+
+def build_rota_model(df_shifts):
+    """Melt the wide rota into one row per (agent, day) with parsed shift times.
+
+    Agents are keyed on their lower-cased name, keeping the first rota row when
+    a name appears twice, which matches how the dashboard looks agents up.
+    """
+    if df_shifts.empty or "Agent Name" not in df_shifts.columns:
+        return _empty_rota()
+
+    rota = df_shifts.assign(**{"Agent Key": df_shifts["Agent Name"].str.lower()})
+    rota = rota.drop_duplicates("Agent Key", keep="first")
+
+    col_dates = pd.to_datetime(pd.Series(rota.columns), format=ROTA_DATE_FORMAT, errors="coerce")
+    date_cols = [
+        col for col, d in zip(rota.columns, col_dates)
+        if pd.notna(d) and d.strftime(ROTA_DATE_FORMAT) == col
+    ]
+    if not date_cols:
+        return _empty_rota()
+
+    long = rota.melt(id_vars="Agent Key", value_vars=date_cols, var_name="Column", value_name="Raw")
+    long["Date"] = pd.to_datetime(long["Column"], format=ROTA_DATE_FORMAT)
+
+    codes, uniques = pd.factorize(long["Raw"].fillna("").astype(str))
+    lookup = _shift_lookup(uniques)
+    for col in ("Shift", "Day Type"):
+        long[col] = lookup[col].to_numpy()[codes]
+    long["Sched Start"] = long["Date"] + lookup["Start Offset"].to_numpy()[codes]
+    long["Sched End"] = long["Date"] + lookup["End Offset"].to_numpy()[codes]
+
+    return long[ROTA_COLUMNS].reset_index(drop=True)
+
+
+def first_login_by_day(presence_days):
+    """Earliest presence segment start per agent per calendar day.
+
+    Takes the ``split_at_midnight`` presence table; the tail of a segment
+    carried over from the previous day is not a login.
+    """
+    if presence_days.empty:
+        return pd.DataFrame(
+            {
+                "Agent": pd.Series(dtype=object),
+                "Date": pd.Series(dtype="datetime64[ns]"),
+                "First Login": pd.Series(dtype="datetime64[ns]"),
+            }
+        )
+    starts = presence_days[~presence_days["Continued"]]
+    return (
+        starts.groupby(["Created By: Full Name", "Day"], as_index=False)["Start DT"]
+        .min()
+        .rename(columns={"Created By: Full Name": "Agent", "Day": "Date", "Start DT": "First Login"})
+    )
+
+
+def rota_window(rota, first_logins, agent, anchor_date, days):
+    """Rota rows for ``agent`` over the ``days`` ending on ``anchor_date``.
+
+    Rows are newest first and carry the agent's first login for the day (NaT
+    when they did not log in). Days missing from the rota count as not assigned.
+    """
+    window = pd.DataFrame(
+        {"Date": pd.date_range(end=pd.Timestamp(anchor_date), periods=days, freq="D")[::-1]}
+    )
+    agent_rota = rota[rota["Agent Key"] == agent.lower()].drop(columns="Agent Key")
+    window = window.merge(agent_rota, on="Date", how="left")
+    window["Shift"] = window["Shift"].fillna("")
+    window["Day Type"] = window["Day Type"].fillna("not_assigned")
+
+    logins = first_logins[first_logins["Agent"] == agent][["Date", "First Login"]]
+    return window.merge(logins, on="Date", how="left")
+
+
+LATE_THRESHOLD_MINUTES = 5
+
+
+def late_minutes(window):
+    """Minutes late per rota row; NaN unless the day was scheduled and the
+    first login came ``LATE_THRESHOLD_MINUTES`` or more after the rota start."""
+    delay = (window["First Login"] - window["Sched Start"]).dt.total_seconds() / 60
+    return delay.where((window["Day Type"] == "scheduled") & (delay >= LATE_THRESHOLD_MINUTES))
+
+
+def lateness_summary(window):
+    """Return (total minutes late, incidents) for a ``rota_window`` frame.
+
+    Rota cells marked late are always incidents, with no minutes attached.
+    """
+    minutes = late_minutes(window)
+    late = minutes.notna()
+    recorded = window["Day Type"] == "manual_late"
+    incidents = window.loc[late | recorded, ["Date"]].assign(**{"Minutes Late": minutes[late]})
+    return float(minutes.sum()), incidents.reset_index(drop=True)
+
+
+def absence_summary(window):
+    """Return (absent dates, sick dates) for a ``rota_window`` frame.
+
+    Absent means scheduled on the rota with no presence that day.
+    """
+    absent = window.loc[
+        (window["Day Type"] == "scheduled") & window["First Login"].isna(), "Date"
+    ]
+    sick = window.loc[window["Day Type"] == "sick", "Date"]
+    return absent.reset_index(drop=True), sick.reset_index(drop=True)
+
+
+# -----------------------------
+# Day splitting
+# -----------------------------
+def split_at_midnight(df):
+    """Split each interval into one row per calendar day it covers.
+
+    Pieces keep every original column, with ``Start DT``/``End DT`` clipped
+    to the day, plus ``Day`` (midnight of that day), ``Continued`` (True for
+    pieces after the first) and ``Total Seconds`` (the unsplit duration).
+    Rows with a missing timestamp are dropped; zero-length and backwards
+    intervals stay as a single piece on their start day.
+    """
+    if df.empty or not {"Start DT", "End DT"}.issubset(df.columns):
+        return df.iloc[:0].assign(
+            **{
+                "Total Seconds": pd.Series(dtype=float),
+                "Day": pd.Series(dtype="datetime64[ns]"),
+                "Continued": pd.Series(dtype=bool),
+            }
+        )
+    valid = df[df["Start DT"].notna() & df["End DT"].notna()]
+    start = valid["Start DT"].to_numpy("datetime64[ns]")
+    end = valid["End DT"].to_numpy("datetime64[ns]")
+    first_day = start.astype("datetime64[D]")
+    # An interval ending exactly at midnight does not touch the next day.
+    last_day = (end - np.timedelta64(1, "ns")).astype("datetime64[D]")
+    spans = np.maximum((last_day - first_day).astype(np.int64), 0) + 1
+
+    take = np.repeat(np.arange(len(valid)), spans)
+    offset = np.arange(len(take)) - np.repeat(np.cumsum(spans) - spans, spans)
+    day = (first_day[take] + offset.astype("timedelta64[D]")).astype("datetime64[ns]")
+    day_end = day + np.timedelta64(1, "D")
+
+    pieces = valid.iloc[take].reset_index(drop=True)
+    pieces["Total Seconds"] = (end - start)[take] / np.timedelta64(1, "s")
+    pieces["Start DT"] = np.maximum(start[take], day)
+    pieces["End DT"] = np.where(offset == spans[take] - 1, end[take], np.minimum(end[take], day_end))
+    pieces["Day"] = day
+    pieces["Continued"] = offset > 0
+    return pieces
+
+
+def segment_ends(pieces):
+    """Unclipped end of the segment each first piece (``Continued`` False) was split from."""
+    return pieces["Start DT"] + pd.to_timedelta(pieces["Total Seconds"], unit="s")
+
+
+# -----------------------------
+# Daily metric rows
+# -----------------------------
+AVAILABLE_STATUSES = {"Available_Chat", "Available_Email_and_Web", "Available_All"}
+CHAT_CHANNEL = "sfdc_liveagent"
+EMAIL_CHANNEL = "casesChannel"
+
+# Lunch should start 3–5 hours into the rota shift, with 15 minutes' grace either side.
+LUNCH_WINDOW_SECONDS = (2 * 3600 + 45 * 60, 5 * 3600 + 15 * 60)
+
+
+# Which channels each available status takes work from.
+STATUS_CHANNELS = {
+    "Available_Chat": {CHAT_CHANNEL},
+    "Available_Email_and_Web": {EMAIL_CHANNEL},
+    "Available_All": {CHAT_CHANNEL, EMAIL_CHANNEL},
+}
+
+# Capacity units each open item consumes; occupancy weights concurrent items by these.
+CHANNEL_CAPACITY_WEIGHTS = {CHAT_CHANNEL: 1.0, EMAIL_CHANNEL: 1.0}
+
+UTILISATION_FIELDS = [
+    "available_seconds_exact",
+    "chat_available_seconds",
+    "email_available_seconds",
+    "handling_seconds",
+    "chat_handling_seconds",
+    "email_handling_seconds",
+    "weighted_load_seconds",
+]
+
+
+def _interval_bounds(frame):
+    """Start/end of each well-formed interval as int64 nanoseconds."""
+    valid = frame[frame["Start DT"].notna() & frame["End DT"].notna() & (frame["End DT"] > frame["Start DT"])]
+    return (
+        valid["Start DT"].to_numpy("datetime64[ns]").astype(np.int64),
+        valid["End DT"].to_numpy("datetime64[ns]").astype(np.int64),
+        valid,
+    )
+
+
+def _coverage(starts, ends, weights, breakpoints):
+    """Summed weight of the intervals covering each elementary segment between breakpoints."""
+    delta = np.zeros(len(breakpoints))
+    np.add.at(delta, np.searchsorted(breakpoints, starts), weights)
+    np.add.at(delta, np.searchsorted(breakpoints, ends), -weights)
+    return np.cumsum(delta)[:-1]
+
+
+def channel_utilisation_by_day(presence, items, days):
+    """Exact-second availability and handling per channel, as a dict of day -> fields.
+
+    All intervals are swept once: every presence and item boundary plus each
+    day's midnight becomes a breakpoint, coverage between breakpoints comes
+    from cumulative sums of +/- events, and segment lengths are binned by
+    day. Chat handling only counts while the agent is available for chat
+    (Available_Chat or Available_All), email likewise; overlapping items of a
+    channel count once towards its handling time but each item adds its
+    capacity weight to ``weighted_load_seconds``.
+    """
+    day_starts = np.array([pd.Timestamp(d).value for d in days], dtype=np.int64)
+    result = {d: dict.fromkeys(UTILISATION_FIELDS, 0.0) for d in days}
+    if not len(days):
+        return result
+    order = np.argsort(day_starts)
+    sorted_starts = day_starts[order]
+    day_ns = pd.Timedelta(days=1).value
+
+    p_start, p_end, p_valid = _interval_bounds(presence)
+    status = p_valid["Service Presence Status: Developer Name"]
+    i_start, i_end, i_valid = _interval_bounds(items)
+    channel = i_valid["Service Channel: Developer Name"]
+
+    breakpoints = np.unique(np.concatenate([sorted_starts, sorted_starts + day_ns, p_start, p_end, i_start, i_end]))
+    seg_start = breakpoints[:-1]
+    seg_len = np.diff(breakpoints).astype(float) / 1e9
+
+    day_pos = np.searchsorted(sorted_starts, seg_start, side="right") - 1
+    in_day = (day_pos >= 0) & (seg_start < sorted_starts[day_pos.clip(min=0)] + day_ns)
+
+    def covered(mask):
+        return _coverage(p_start[mask], p_end[mask], np.ones(mask.sum()), breakpoints) > 0
+
+    def load(mask, weight):
+        return _coverage(i_start[mask], i_end[mask], np.full(mask.sum(), weight), breakpoints)
+
+    chat_mask = (channel == CHAT_CHANNEL).to_numpy()
+    email_mask = (channel == EMAIL_CHANNEL).to_numpy()
+    chat_statuses = [s for s, channels in STATUS_CHANNELS.items() if CHAT_CHANNEL in channels]
+    email_statuses = [s for s, channels in STATUS_CHANNELS.items() if EMAIL_CHANNEL in channels]
+    chat_available = covered(status.isin(chat_statuses).to_numpy())
+    email_available = covered(status.isin(email_statuses).to_numpy())
+    available = covered(status.isin(AVAILABLE_STATUSES).to_numpy())
+    chat_load = load(chat_mask, CHANNEL_CAPACITY_WEIGHTS[CHAT_CHANNEL])
+    email_load = load(email_mask, CHANNEL_CAPACITY_WEIGHTS[EMAIL_CHANNEL])
+    chat_open = load(chat_mask, 1.0) > 0
+    email_open = load(email_mask, 1.0) > 0
+
+    series = {
+        "available_seconds_exact": available,
+        "chat_available_seconds": chat_available,
+        "email_available_seconds": email_available,
+        "handling_seconds": available & (chat_open | email_open),
+        "chat_handling_seconds": chat_available & chat_open,
+        "email_handling_seconds": email_available & email_open,
+        "weighted_load_seconds": np.where(available, chat_load + email_load, 0.0),
+    }
+    totals = {
+        field: np.bincount(day_pos[in_day], weights=(seg_len * values)[in_day], minlength=len(days))
+        for field, values in series.items()
+    }
+    for pos, idx in enumerate(order):
+        result[days[idx]] = {field: float(totals[field][pos]) for field in UTILISATION_FIELDS}
+    return result
+
+
+# Omni-Channel's own per-segment durations, in seconds. Idle and at-capacity
+# time only count on segments where the agent is not away.
+PRESENCE_DURATION_COLUMNS = ["Is Away", "Idle Duration", "At Capacity Duration", "Status Duration"]
+PRESENCE_FIELDS = ["online_seconds", "idle_seconds", "at_capacity_seconds", "away_seconds"]
+
+DAILY_FIELDS = [
+    "chat_items",
+    "chat_seconds",
+    "email_items",
+    "email_seconds",
+    *UTILISATION_FIELDS,
+    "days_worked",
+    "shift_seconds",
+    "available_seconds",
+    "lunch_days_with_data",
+    "lunch_days_out_of_window",
+    *PRESENCE_FIELDS,
+]
+COUNT_FIELDS = ["chat_items", "email_items", "days_worked", "lunch_days_with_data", "lunch_days_out_of_window"]
+
+
+def daily_metric_table(items_days, presence_days, rota, agents, days):
+    """Additive metrics for several agents at once, indexed by (Agent, Day).
+
+    ``items_days`` and ``presence_days`` are (subsets of) the
+    ``split_at_midnight`` tables and ``rota`` the rota model. Items count
+    once, on the day they started, with their full duration; time-based
+    fields use the pieces falling on each day. Every field is a count or a
+    sum, so a date range is the column sums of its days. Agents or days with
+    no data get zeros.
+    """
+    index = pd.MultiIndex.from_product([list(agents), pd.to_datetime(list(days))], names=["Agent", "Day"])
+    table = pd.DataFrame(0.0, index=index, columns=DAILY_FIELDS)
+    if not len(index):
+        return table.astype({field: int for field in COUNT_FIELDS})
+
+    def fill(field, values):
+        table[field] = values.rename_axis(["Agent", "Day"]).reindex(index, fill_value=0).astype(float)
+
+    item_starts = items_days[~items_days["Continued"]]
+    item_channel = item_starts["Service Channel: Developer Name"]
+    for prefix, name in (("chat", CHAT_CHANNEL), ("email", EMAIL_CHANNEL)):
+        grouped = item_starts[item_channel == name].groupby(["User: Full Name", "Day"])["Total Seconds"]
+        fill(f"{prefix}_items", grouped.size())
+        fill(f"{prefix}_seconds", grouped.sum())
+
+    keys = ["Created By: Full Name", "Day"]
+    status = presence_days["Service Presence Status: Developer Name"]
+    piece_seconds = (presence_days["End DT"] - presence_days["Start DT"]).dt.total_seconds()
+    fill("days_worked", (~presence_days["Continued"]).groupby([presence_days[k] for k in keys]).any())
+    # A day's shift runs from its first login to the end of the last segment
+    # begun that day, past midnight if need be; a tail carried over from the
+    # previous day only counts towards the time totals.
+    begun = presence_days[~presence_days["Continued"]]
+    begun_keys = [begun[k] for k in keys]
+    segment_end = segment_ends(begun)
+    fill(
+        "shift_seconds",
+        (segment_end.groupby(begun_keys).max() - begun["Start DT"].groupby(begun_keys).min()).dt.total_seconds(),
+    )
+    fill(
+        "available_seconds",
+        piece_seconds.where(status.isin(AVAILABLE_STATUSES), 0.0).groupby([presence_days[k] for k in keys]).sum(),
+    )
+
+    if set(PRESENCE_DURATION_COLUMNS).issubset(presence_days.columns):
+        # A piece split off at midnight takes its share of the segment's durations.
+        share = (piece_seconds / presence_days["Total Seconds"]).where(presence_days["Total Seconds"] > 0, 1.0)
+        reported = {col: pd.to_numeric(presence_days[col], errors="coerce").fillna(0) for col in PRESENCE_DURATION_COLUMNS}
+        away = reported["Is Away"] > 0
+        online = pd.DataFrame({
+            "online_seconds": reported["Status Duration"].where(~away, 0.0),
+            "idle_seconds": reported["Idle Duration"].where(~away, 0.0),
+            "at_capacity_seconds": reported["At Capacity Duration"].where(~away, 0.0),
+            "away_seconds": reported["Status Duration"].where(away, 0.0),
+        }).mul(share, axis=0)
+        for field, values in online.groupby([presence_days[k] for k in keys]).sum().items():
+            fill(field, values)
+
+    lunch = presence_days[(status == "Busy_Lunch") & ~presence_days["Continued"]]
+    lunch = lunch.groupby(keys, as_index=False)["Start DT"].min()
+    lunch = lunch.assign(**{"Agent Key": lunch["Created By: Full Name"].str.lower()}).merge(
+        rota[["Agent Key", "Date", "Sched Start"]].rename(columns={"Date": "Day"}), on=["Agent Key", "Day"]
+    )
+    lunch = lunch[lunch["Sched Start"].notna()].set_index(keys)
+    time_to_lunch = (lunch["Start DT"] - lunch["Sched Start"]).dt.total_seconds()
+    fill("lunch_days_with_data", pd.Series(1, index=lunch.index))
+    fill(
+        "lunch_days_out_of_window",
+        ((time_to_lunch < LUNCH_WINDOW_SECONDS[0]) | (time_to_lunch > LUNCH_WINDOW_SECONDS[1])).astype(int),
+    )
+
+    # The interval sweep is per agent; each call covers every requested day.
+    presence_by_agent = dict(list(presence_days.groupby("Created By: Full Name")))
+    items_by_agent = dict(list(items_days.groupby("User: Full Name")))
+    utilisation_rows = []
+    for agent in agents:
+        utilisation = channel_utilisation_by_day(
+            presence_by_agent.get(agent, presence_days.iloc[:0]), items_by_agent.get(agent, items_days.iloc[:0]), days
+        )
+        utilisation_rows.extend(utilisation[d] for d in days)
+    table[UTILISATION_FIELDS] = pd.DataFrame(utilisation_rows, index=index, columns=UTILISATION_FIELDS)
+
+    return table.astype({field: int for field in COUNT_FIELDS})
+
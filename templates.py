@@ -0,0 +1,79 @@
+"""HTML templates for metric cards, incident lists and empty states.
+
+Sections build structured records and render them with these templates in
+one pass, so each section is a single ``st.markdown`` call rather than one
+call (and one Streamlit delta) per card or column. Output is kept on one
+line: a blank or indented line inside an HTML block would end it and turn
+the rest into Markdown.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from html import escape
+
+# tone -> (card class, value class)
+CARD_TONES = {
+    "plain": ("metric-container", "metric-value"),
+    "accent": ("metric-container", "metric-value-accent"),
+    "success": ("metric-container", "metric-value-success"),
+    "warning": ("metric-container-warning", "metric-value"),
+}
+
+CARD = '<div class="{box}"><div class="metric-title">{title}</div><div class="{value_class}">{value}</div>{extra}</div>'
+CARD_DETAIL = '<div class="metric-title" style="margin-top:12px;">{title}</div><div class="metric-value">{value}</div>'
+CARD_ROW = '<div class="card-row" style="grid-template-columns: repeat({columns}, minmax(0, 1fr));">{cards}</div>'
+INCIDENT = '<li class="incident-item"><span class="incident-date">{date}</span><span class="incident-badge">{badge}</span></li>'
+INCIDENT_LIST = '<ul class="incident-list">{items}</ul>'
+EMPTY_STATE = '<div class="empty-state">{image}<div class="empty-state-label">{label}</div></div>'
+EMPTY_STATE_IMAGE = '<img src="{src}" width="220" style="opacity:0.85;" />'
+
+# ``benchmark`` is ready-made HTML; ``details`` are (title, value) pairs shown under the main value.
+Card = namedtuple("Card", ["title", "value", "tone", "benchmark", "details"], defaults=("plain", "", ()))
+
+# ``date`` is a date or Timestamp; ``badge`` the text shown against it.
+Incident = namedtuple("Incident", ["date", "badge"])
+
+
+def card_html(card):
+    box, value_class = CARD_TONES[card.tone]
+    details = "".join(CARD_DETAIL.format(title=escape(t), value=escape(str(v))) for t, v in card.details)
+    return CARD.format(
+        box=box,
+        title=escape(card.title),
+        value_class=value_class,
+        value=escape(str(card.value)),
+        extra=card.benchmark + details,
+    )
+
+
+def cards_html(*rows):
+    """One grid row per list of cards, each row splitting the width evenly."""
+    return "".join(
+        CARD_ROW.format(columns=len(row), cards="".join(card_html(card) for card in row)) for row in rows if row
+    )
+
+
+@lru_cache(maxsize=4096)
+def day_label(day, date_format="%d %b %Y"):
+    """Formatted date, memoised: the same days come back on every rerun and
+    strftime is the bulk of rendering a long incident list."""
+    return day.strftime(date_format)
+
+
+@lru_cache(maxsize=256)
+def _badge(text):
+    return escape(text)
+
+
+def incident_list_html(incidents, date_format="%d %b %Y"):
+    items = "".join(
+        INCIDENT.format(date=day_label(incident.date, date_format), badge=_badge(incident.badge))
+        for incident in incidents
+    )
+    return INCIDENT_LIST.format(items=items)
+
+
+def empty_state_html(label, image=None):
+    return EMPTY_STATE.format(
+        image=EMPTY_STATE_IMAGE.format(src=image) if image else "",
+        label=escape(label),
+    )
@@ -0,0 +1,61 @@
+"""Rolling-window trends built from an agent's per-day metric table."""
+import pandas as pd
+
+from benchmarks import BENCHMARK_METRICS, metric_values
+
+ROLLING_WINDOWS = [7, 28]
+MAX_TREND_POINTS = 120
+
+# Chart -> {series label: (metric or daily field, scale)}. Ratios are taken
+# from the rolling sums of their numerator and denominator, never averaged.
+TREND_SERIES = {
+    "AHT (min)": {"Chat": ("aht_chat", 1 / 60), "Email": ("aht_email", 1 / 60)},
+    "Volume": {"Chat items": ("chat_items", 1), "Email items": ("email_items", 1)},
+    "Utilisation (%)": {
+        "Shift": ("shift_utilisation", 100),
+        "Chat": ("chat_utilisation", 100),
+        "Email": ("email_utilisation", 100),
+    },
+    "Presence (%)": {"Idle": ("idle_share", 100), "At capacity": ("at_capacity_share", 100)},
+    "Lateness (min)": {"Minutes late": ("minutes_late", 1)},
+}
+
+
+def rolling_sums(daily, window):
+    """Trailing ``window``-day sums of every column of a contiguous per-day table.
+
+    Each sum is the difference of two cumulative sums, so the cost does not
+    grow with the window. Days whose window would start before the table are
+    NaN rather than partial sums.
+    """
+    cumulative = daily.astype(float).cumsum()
+    sums = cumulative - cumulative.shift(window, fill_value=0.0)
+    sums.iloc[: window - 1] = float("nan")
+    return sums
+
+
+def downsample(frame, max_points=MAX_TREND_POINTS):
+    """Keep every k-th row, counting back from the last, so at most ``max_points`` remain."""
+    step = max(1, -(-len(frame) // max_points))
+    return frame.iloc[::-1].iloc[::step].iloc[::-1]
+
+
+def agent_trends(daily, start, end, window, max_points=MAX_TREND_POINTS):
+    """{chart: frame of rolling series indexed by day} for ``start``..``end``.
+
+    ``daily`` is one agent's rows of ``TeamBenchmarks.daily``. Sampling only
+    drops points: each remaining value is still the exact rolling figure.
+    """
+    sums = rolling_sums(daily, window)
+    sums = downsample(sums[(sums.index >= pd.Timestamp(start)) & (sums.index <= pd.Timestamp(end))], max_points)
+    charts = {}
+    for chart, series in TREND_SERIES.items():
+        charts[chart] = pd.DataFrame(
+            {
+                label: (metric_values(sums, name) if name in BENCHMARK_METRICS else sums[name]) * scale
+                for label, (name, scale) in series.items()
+            },
+            index=sums.index,
+        )
+    return charts
+
@@ -0,0 +1,78 @@
+"""Data-quality checks run once per data version.
+
+Each check is a vectorised filter over a whole export and returns the
+offending rows, so the dashboard can show what would otherwise be silently
+folded into the metrics.
+"""
+import pandas as pd
+
+PRESENCE_AGENT = "Created By: Full Name"
+ONE_DAY = pd.Timedelta(days=1)
+
+
+def _unparsed(df, label):
+    """Rows whose timestamps could not be parsed and were coerced to NaT."""
+    if df is None or df.empty or "Start DT" not in df.columns or "End DT" not in df.columns:
+        return pd.DataFrame()
+    bad = df[df["Start DT"].isna() | df["End DT"].isna()]
+    return bad.assign(Source=label)
+
+
+def overlapping_presence(df_presence):
+    """Presence segments that start before an earlier segment of the same agent has ended."""
+    p = df_presence.dropna(subset=["Start DT", "End DT"]).sort_values([PRESENCE_AGENT, "Start DT"], kind="stable")
+    latest_end = p.groupby(PRESENCE_AGENT)["End DT"].cummax()
+    previous_end = latest_end.groupby(p[PRESENCE_AGENT]).shift()
+    return p[p["Start DT"] < previous_end]
+
+
+def zero_length_presence(df_presence):
+    return df_presence[df_presence["End DT"] <= df_presence["Start DT"]]
+
+
+def presence_crossing_midnight(df_presence):
+    """Segments that run past the midnight after they started."""
+    return df_presence[df_presence["End DT"] > df_presence["Start DT"].dt.normalize() + ONE_DAY]
+
+
+def negative_item_durations(df_items):
+    return df_items[df_items["End DT"] < df_items["Start DT"]]
+
+
+def chats_without_presence(df_chat, df_presence):
+    """Chats whose owner had no presence segment open when the chat started.
+
+    Each chat is matched (``merge_asof``) to the agent's last segment starting
+    at or before it, carrying the running maximum end time so overlapping
+    segments cannot hide an open one.
+    """
+    if df_chat.empty or not {"Agent Name", "Start DT"}.issubset(df_chat.columns):
+        return pd.DataFrame()
+    p = df_presence.dropna(subset=["Start DT", "End DT"]).sort_values([PRESENCE_AGENT, "Start DT"], kind="stable")
+    windows = pd.DataFrame({
+        "Agent Name": p[PRESENCE_AGENT],
+        "Start DT": p["Start DT"].astype("datetime64[ns]"),
+        "Open Until": p.groupby(PRESENCE_AGENT)["End DT"].cummax().astype("datetime64[ns]"),
+    }).sort_values("Start DT", kind="stable")
+
+    chats = df_chat.dropna(subset=["Start DT"])
+    chats = chats.assign(**{"Start DT": chats["Start DT"].astype("datetime64[ns]")}).sort_values("Start DT")
+    matched = pd.merge_asof(chats, windows, on="Start DT", by="Agent Name", direction="backward")
+    return matched[~(matched["Open Until"] >= matched["Start DT"])].drop(columns="Open Until")
+
+
+def build_quality_report(df_items, df_presence, df_chat):
+    """Return an ordered dict of check label -> flagged rows (only non-empty checks)."""
+    unparsed = pd.concat(
+        [_unparsed(df_items, "report_items.csv"), _unparsed(df_presence, "report_presence.csv")],
+        ignore_index=True,
+    )
+    checks = {
+        "Unparseable timestamps": unparsed,
+        "Overlapping presence segments": overlapping_presence(df_presence),
+        "Zero-length presence segments": zero_length_presence(df_presence),
+        "Presence segments crossing midnight": presence_crossing_midnight(df_presence),
+        "Items ending before they start": negative_item_durations(df_items),
+        "Chats with no matching presence": chats_without_presence(df_chat, df_presence),
+    }
+    return {label: rows for label, rows in checks.items() if not rows.empty}
@@ -0,0 +1,189 @@
+"""Per-agent dashboard payloads, computed once and shared by every session.
+
+Everything the agent page shows for one agent and date range is gathered
+here from a data snapshot, so the page itself only formats and renders.
+Payloads are read-only: the dashboard caches them process-wide keyed on the
+data version, and a cached payload is handed to every session that asks
+for the same view.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+import pandas as pd
+
+from benchmarks import LONG_CHAT_THRESHOLD_SECONDS
+from metrics import LATE_THRESHOLD_MINUTES, absence_summary, lateness_summary, rota_window, segment_ends
+from trends import agent_trends
+
+NOT_ON_ROTA = ("", "not_assigned", pd.NaT)
+LONG_CHAT_COLUMNS = {"Agent Name", "Start DT", "End DT", "Duration (s)"}
+
+# range_totals: the agent's row of the team range totals; range_benchmarks: team distributions for
+# the range; long_chats: None when the chat export lacks the needed columns.
+AgentRangeView = namedtuple(
+    "AgentRangeView",
+    [
+        "has_presence", "has_scheduled_shift", "has_sick_event",
+        "range_totals", "range_benchmarks", "long_chats", "per_day", "surveys", "emails",
+    ],
+)
+
+# late_df / late_benchmarks / absent_dates / sick_dates are None without a rota.
+AgentHistoryView = namedtuple(
+    "AgentHistoryView",
+    [
+        "total_minutes_late", "late_df", "late_totals", "late_benchmarks",
+        "absent_dates", "sick_dates", "trend_charts",
+    ],
+)
+
+
+def _per_day_row(day, rota_entry, agent_daily):
+    """One row of the Per-Day Shift & Adherence table."""
+    sched_shift, day_type, sched_start = rota_entry
+    date_label = day.strftime("%d %b %Y")
+
+    # A day only carrying the tail of the previous day's segment is not attended.
+    if agent_daily is None or agent_daily["Continued"].all():
+        if day_type == "sick":
+            status = "Sick"
+        elif day_type == "scheduled":
+            status = "Absent (Scheduled)"
+        elif day_type == "manual_late":
+            status = "Late (Recorded)"
+        elif day_type == "other_event":
+            status = sched_shift
+        else:
+            status = "Day Off / Not Assigned"
+        return {
+            "Date": date_label,
+            "Scheduled Shift": sched_shift or "Not Assigned",
+            "Actual Shift": "—",
+            "Lunch Break": "—",
+            "Late (min)": "",
+            "Status": status,
+        }
+
+    # The day is the segments begun on it, each up to its real end; the tail
+    # carried over from the previous day belongs to that day's shift.
+    begun = agent_daily[~agent_daily["Continued"]]
+    begun = begun.assign(**{"End DT": segment_ends(begun)})
+    first_login = begun["Start DT"].min()
+    latest = begun["End DT"].max()
+
+    # Show the full recorded lunch break window and total duration.
+    lunch_segments = begun[begun["Service Presence Status: Developer Name"] == "Busy_Lunch"]
+    if not lunch_segments.empty:
+        lunch_start = lunch_segments["Start DT"].min()
+        lunch_end = lunch_segments["End DT"].max()
+        lunch_seconds = (lunch_segments["End DT"] - lunch_segments["Start DT"]).dt.total_seconds().clip(lower=0).sum()
+        lunch_break_str = f"{lunch_start.strftime('%H:%M')}–{lunch_end.strftime('%H:%M')} ({int(round(lunch_seconds / 60))} min)"
+    else:
+        lunch_break_str = "—"
+
+    late = ""
+    status = "Worked"
+    if day_type == "sick":
+        status = "Sick (worked)"
+    elif day_type == "manual_late":
+        status = "Late (Recorded)"
+    elif day_type == "scheduled" and pd.notna(sched_start):
+        delay = (first_login - sched_start).total_seconds() / 60
+        if delay >= LATE_THRESHOLD_MINUTES:
+            late = int(delay)
+            status = "Late"
+        else:
+            status = "On Time"
+
+    return {
+        "Date": date_label,
+        "Scheduled Shift": sched_shift or "Not Assigned",
+        "Actual Shift": f"{first_login.strftime('%H:%M')}–{latest.strftime('%H:%M')}",
+        "Lunch Break": lunch_break_str,
+        "Late (min)": late,
+        "Status": status,
+    }
+
+
+def build_agent_range_view(snapshot, daily_cache, agent, start, end):
+    """Everything shown for ``agent`` over the inclusive range ``start``..``end``.
+
+    Metric totals are read from the team table built at ingest, the same
+    numbers the team benchmarks and the export API use. Per-day adherence
+    rows come from ``daily_cache`` (a ``DailyResultCache``), so overlapping
+    ranges still share their days.
+    """
+    df_presence = snapshot.df_presence
+    range_start, range_end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(hours=23, minutes=59)
+    has_presence = bool(
+        (
+            (df_presence["Created By: Full Name"] == agent)
+            & (df_presence["End DT"] >= range_start)
+            & (df_presence["Start DT"] <= range_end)
+        ).any()
+    )
+
+    agent_rota = snapshot.rota_model[snapshot.rota_model["Agent Key"] == agent.lower()]
+    rota_by_day = {
+        day.date(): (shift, day_type, sched_start)
+        for day, shift, day_type, sched_start in zip(
+            agent_rota["Date"], agent_rota["Shift"], agent_rota["Day Type"], agent_rota["Sched Start"]
+        )
+    }
+
+    day_list = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    day_types = {rota_by_day.get(d, NOT_ON_ROTA)[1] for d in day_list}
+
+    df_chat = snapshot.df_chat
+    long_chats = None
+    if not df_chat.empty and LONG_CHAT_COLUMNS.issubset(df_chat.columns):
+        chat_days = df_chat["Start DT"].dt.date
+        agent_chats = df_chat[(df_chat["Agent Name"] == agent) & (chat_days >= start) & (chat_days <= end)]
+        long_chats = agent_chats[
+            agent_chats["Duration (s)"] >= LONG_CHAT_THRESHOLD_SECONDS
+        ].sort_values("Start DT").reset_index(drop=True)
+
+    # Per-day rows read the midnight-split presence table built once at ingest;
+    # only days not seen before for this agent are computed.
+    def per_day_rows(missing):
+        agent_presence_days = snapshot.presence_days[snapshot.presence_days["Created By: Full Name"] == agent]
+        presence_by_day = {
+            day.date(): group
+            for day, group in agent_presence_days[
+                agent_presence_days["Day"].isin(pd.to_datetime(missing))
+            ].groupby("Day")
+        }
+        return {d: _per_day_row(d, rota_by_day.get(d, NOT_ON_ROTA), presence_by_day.get(d)) for d in missing}
+
+    per_day = pd.DataFrame(daily_cache.get_range((snapshot.version, agent), day_list, per_day_rows))
+    if not per_day.empty:
+        # Coerce Late (min) to string to avoid Arrow int/str mix issues
+        per_day["Late (min)"] = per_day["Late (min)"].astype(str)
+
+    return AgentRangeView(
+        has_presence, "scheduled" in day_types, "sick" in day_types,
+        snapshot.team.range_totals(start, end).loc[agent], snapshot.team.distribution(start, end), long_chats, per_day,
+        snapshot.cases.agent_surveys(agent, start, end), snapshot.cases.agent_emails(agent, start, end),
+    )
+
+
+def build_agent_history_view(snapshot, agent, anchor, lateness_lookback, absence_lookback, trend_lookback, trend_window):
+    """Lateness, absence and trends for the lookback windows ending on ``anchor``."""
+    late = absences = (None, None)
+    late_totals = late_benchmarks = None
+    if not snapshot.rota_model.empty:
+        late_window = rota_window(snapshot.rota_model, snapshot.first_logins, agent, anchor, lateness_lookback)
+        late = lateness_summary(late_window)
+        late_totals = {
+            "minutes_late": late[0],
+            "scheduled_days": int((late_window["Day Type"] == "scheduled").sum()),
+        }
+        late_benchmarks = snapshot.team.distribution(late_window["Date"].min(), late_window["Date"].max())
+        absences = absence_summary(
+            rota_window(snapshot.rota_model, snapshot.first_logins, agent, anchor, absence_lookback)
+        )
+
+    trend_charts = agent_trends(
+        snapshot.team.daily.loc[agent], anchor - timedelta(days=trend_lookback - 1), anchor, trend_window
+    )
+    return AgentHistoryView(*late, late_totals, late_benchmarks, *absences, trend_charts)